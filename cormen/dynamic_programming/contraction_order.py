@@ -0,0 +1,320 @@
+"""
+Given a network of tensors <T0, T1, ..., Tn-1>, where every tensor is labeled by its indices, find an order of pairwise
+contractions, which minimizes the number of scalar multiplications, just as matrix_chain_mult does for a chain of
+matrices. Contraction of two tensors costs the product of sizes of all the indices they carry, and its result keeps
+only the indices, which are still carried by the other tensors or by the output.
+
+A path is a list of pairs of positions in the current list of tensors: both tensors are removed and their contraction
+is appended to the end of the list (the same convention numpy.einsum_path uses).
+"""
+
+import collections
+import itertools
+import unittest
+
+import matix_chain_mult
+
+# Path of contractions, estimated number of scalar multiplications, size of the largest intermediate tensor and the
+# method, that found the path
+ContractionPlan = collections.namedtuple('ContractionPlan', ['path', 'flops', 'peak_size', 'method'])
+
+# Networks up to this number of tensors are solved exactly by the dynamic programming over subsets
+EXACT_LIMIT = 12
+
+
+def parse_einsum(subscripts, *shapes):
+    # Provide inputs, output and sizes of indices for a subscripts string like 'ij,jk->ik' and shapes of the operands
+    inputs, output = subscripts.replace(' ', '').split('->')
+    inputs = inputs.split(',')
+    assert len(inputs) == len(shapes), "A shape per operand is expected"
+    sizes = {}
+    for labels, shape in zip(inputs, shapes):
+        assert len(labels) == len(shape), "Operand " + labels + " has an unexpected shape"
+        for label, size in zip(labels, shape):
+            assert sizes.setdefault(label, size) == size, "Index " + label + " has inconsistent sizes"
+
+    return (inputs, output, sizes)
+
+
+def optimize_contraction(inputs, output, sizes, method='auto'):
+    # Find a contraction path for tensors labeled by inputs (an iterable of indices per tensor) to produce a tensor
+    # labeled by output, where sizes maps an index to its size. Methods are:
+    # - 'chain': the matrix chain dynamic programming, only for chains of matrices
+    # - 'exact': the dynamic programming over subsets of tensors, O(3^n)
+    # - 'greedy': contract the pair producing the smallest tensor first, O(n^3)
+    # 'auto' picks the first applicable one, the exact one is limited to EXACT_LIMIT tensors
+    inputs = [tuple(labels) for labels in inputs]
+    output = tuple(output)
+    if method == 'auto':
+        if _as_chain(inputs, output, sizes) is not None:
+            method = 'chain'
+        elif len(inputs) <= EXACT_LIMIT:
+            method = 'exact'
+        else:
+            method = 'greedy'
+
+    if len(inputs) < 2:
+        return ContractionPlan([], 0, 0, method)
+    if method == 'chain':
+        p = _as_chain(inputs, output, sizes)
+        assert p is not None, "Tensors are expected to form a chain of matrices"
+        return _chain_plan(p)
+    if method == 'exact':
+        return _exact_plan(inputs, output, sizes)
+    if method == 'greedy':
+        return _greedy_plan(inputs, output, sizes)
+    raise ValueError("Unknown method '" + str(method) + "'")
+
+
+def _size(labels, sizes):
+    size = 1
+    for label in labels:
+        size = size * sizes[label]
+    return size
+
+
+def _as_chain(inputs, output, sizes):
+    # Provide dimensions p of the matrix chain, if the tensors form one: T0 T1 ... Tn-1 -> the first index of T0 and
+    # the last index of Tn-1, where neighbours share a single index
+    if len(inputs) < 2 or any(len(labels) != 2 or labels[0] == labels[1] for labels in inputs):
+        return None
+    if output != (inputs[0][0], inputs[-1][1]):
+        return None
+    for left, right in zip(inputs, inputs[1:]):
+        if left[1] != right[0]:
+            return None
+    counts = collections.Counter(label for labels in inputs for label in labels)
+    if any(count != 2 for label, count in counts.items() if label not in output) or \
+       any(counts[label] != 1 for label in output):
+        return None
+
+    return [sizes[inputs[0][0]]] + [sizes[labels[1]] for labels in inputs]
+
+
+def _chain_plan(p):
+    # Reuse the matrix chain approaches, vectorized one if NumPy is available
+    n = len(p) - 1
+    if n < 2:
+        return ContractionPlan([], 0, 0, 'chain')
+    if matix_chain_mult.np is not None:
+        cost, optimal = matix_chain_mult.matrix_chain_mult_numpy(p)
+    else:
+        cost, optimal = matix_chain_mult.matrix_chain_mult(p)
+
+    # Every split k multiplies Ai..k by Ak+1..j, track products as (i, j) in the current list of tensors
+    tensors = [(i, i) for i in range(n)]
+    path = []
+    peak_size = 0
+    for k in optimal:
+        left = next(position for position, (i, j) in enumerate(tensors) if j == k)
+        right = next(position for position, (i, j) in enumerate(tensors) if i == k + 1)
+        product = (tensors[left][0], tensors[right][1])
+        path.append((left, right))
+        for position in sorted((left, right), reverse=True):
+            del tensors[position]
+        tensors.append(product)
+        peak_size = max(peak_size, p[product[0]] * p[product[1] + 1])
+
+    return ContractionPlan(path, cost, peak_size, 'chain')
+
+
+def _keep(labels, others, output):
+    # Indices of a contraction result: the ones carried by other tensors or by the output
+    return frozenset(label for label in labels if label in others or label in output)
+
+
+def _exact_plan(inputs, output, sizes):
+    # best[S] keeps the cheapest way to contract the subset S of tensors (a bit mask) as (flops, peak size, split),
+    # where S is split into the subset A holding the lowest tensor of S and the rest
+    n = len(inputs)
+    everything = (1 << n) - 1
+    carried = [collections.Counter() for _ in range(1 << n)]
+    for subset in range(1, 1 << n):
+        lowest = (subset & -subset).bit_length() - 1
+        carried[subset] = carried[subset & (subset - 1)] + collections.Counter(set(inputs[lowest]))
+    total = carried[everything]
+    output_set = frozenset(output)
+
+    def labels_of(subset):
+        # Indices of the contraction of the subset: the ones carried by the rest of tensors or by the output
+        inside = carried[subset]
+        return frozenset(label for label, count in inside.items() if count < total[label] or label in output_set)
+
+    # Input tensors carry all their indices, even the ones no other tensor carries, as the other methods count them
+    labels = {1 << t: frozenset(inputs[t]) for t in range(n)}
+    best = {1 << t: (0, 0, None) for t in range(n)}
+    for subset in sorted(range(1, 1 << n), key=lambda s: bin(s).count('1')):
+        if subset in best:
+            continue
+        labels[subset] = labels_of(subset)
+        lowest = subset & -subset
+        rest = subset & ~lowest
+        candidate = None
+        # Enumerate the parts A holding the lowest tensor, the rest B must be non-empty
+        part = rest
+        while True:
+            a = lowest | part
+            b = subset & ~a
+            if b:
+                cost = _size(labels[a] | labels[b], sizes)
+                flops = best[a][0] + best[b][0] + cost
+                if candidate is None or flops < candidate[0]:
+                    peak = max(best[a][1], best[b][1], _size(labels[subset], sizes))
+                    candidate = (flops, peak, a)
+            if part == 0:
+                break
+            part = (part - 1) & rest
+        best[subset] = candidate
+
+    # Unwind the splits into a path: contract the parts first, then the subset
+    path = []
+    tensors = [1 << t for t in range(n)]
+
+    def contract(subset):
+        a = best[subset][2]
+        if a is None:
+            return
+        b = subset & ~a
+        contract(a)
+        contract(b)
+        left, right = tensors.index(a), tensors.index(b)
+        path.append((left, right))
+        for position in sorted((left, right), reverse=True):
+            del tensors[position]
+        tensors.append(subset)
+
+    contract(everything)
+    flops, peak_size, _ = best[everything]
+    return ContractionPlan(path, flops, peak_size, 'exact')
+
+
+def _greedy_plan(inputs, output, sizes):
+    # Contract the pair, which shrinks the total size of tensors the most (the size of the result less the sizes of
+    # the pair), the cheaper pair among equal ones
+    tensors = [frozenset(labels) for labels in inputs]
+    counts = collections.Counter(label for labels in tensors for label in labels)
+    output_set = frozenset(output)
+    path = []
+    flops = 0
+    peak_size = 0
+    while 1 < len(tensors):
+        choice = None
+        for left, right in itertools.combinations(range(len(tensors)), 2):
+            union = tensors[left] | tensors[right]
+            result = frozenset(label for label in union
+                               if label in output_set or
+                               counts[label] > (label in tensors[left]) + (label in tensors[right]))
+            key = (_size(result, sizes) - _size(tensors[left], sizes) - _size(tensors[right], sizes),
+                   _size(union, sizes))
+            if choice is None or key < choice[0]:
+                choice = (key, left, right, result)
+
+        (_, cost), left, right, result = choice
+        path.append((left, right))
+        flops = flops + cost
+        peak_size = max(peak_size, _size(result, sizes))
+        for label in tensors[left]:
+            counts[label] = counts[label] - 1
+        for label in tensors[right]:
+            counts[label] = counts[label] - 1
+        for label in result:
+            counts[label] = counts[label] + 1
+        del tensors[right]
+        del tensors[left]
+        tensors.append(result)
+
+    return ContractionPlan(path, flops, peak_size, 'greedy')
+
+
+class Tests(unittest.TestCase):
+    def assertValidPlan(self, plan, inputs, output, sizes):
+        # Carry out the path with numpy.einsum and compare against a single einsum
+        import numpy as np
+        rng = np.random.default_rng(19)
+        operands = [rng.standard_normal([sizes[label] for label in labels]) for labels in inputs]
+        expected = np.einsum(','.join(inputs) + '->' + output, *operands, optimize=True)
+
+        tensors = list(zip(inputs, operands))
+        for left, right in plan.path:
+            (labels_left, left_operand), (labels_right, right_operand) = tensors[left], tensors[right]
+            others = set(''.join(labels for position, (labels, _) in enumerate(tensors)
+                                 if position not in (left, right)))
+            result = ''.join(sorted(_keep(labels_left + labels_right, others, output)))
+            product = np.einsum(labels_left + ',' + labels_right + '->' + result, left_operand, right_operand)
+            for position in sorted((left, right), reverse=True):
+                del tensors[position]
+            tensors.append((result, product))
+        labels, result = tensors[0]
+        self.assertTrue(np.allclose(np.einsum(labels + '->' + output, result), expected))
+
+    def test_chain(self):
+        inputs, output, sizes = parse_einsum('ab,bc,cd,de,ef,fg->ag', (30, 35), (35, 15), (15, 5), (5, 10),
+                                             (10, 20), (20, 25))
+        chain = optimize_contraction(inputs, output, sizes)
+        exact = optimize_contraction(inputs, output, sizes, method='exact')
+        self.assertEqual(chain.method, 'chain')
+        self.assertEqual(chain.flops, 15125)
+        self.assertEqual(exact.flops, 15125)
+        self.assertValidPlan(chain, inputs, output, sizes)
+        self.assertValidPlan(exact, inputs, output, sizes)
+
+    def test_network(self):
+        import random
+        random.seed(19)
+        for trial in range(30):
+            labels = 'abcdefgh'
+            sizes = {label: random.randint(2, 6) for label in labels}
+            inputs = [''.join(random.sample(labels, random.randint(1, 3))) for _ in range(random.randint(2, 6))]
+            used = sorted(set(''.join(inputs)))
+            output = ''.join(random.sample(used, random.randint(0, min(2, len(used)))))
+            with self.subTest(inputs=inputs, output=output):
+                exact = optimize_contraction(inputs, output, sizes, method='exact')
+                greedy = optimize_contraction(inputs, output, sizes, method='greedy')
+                self.assertLessEqual(exact.flops, greedy.flops)
+                self.assertEqual(len(exact.path), len(inputs) - 1)
+                self.assertValidPlan(exact, inputs, output, sizes)
+                self.assertValidPlan(greedy, inputs, output, sizes)
+
+    def test_brute_force(self):
+        # Try every order of pairwise contractions of small networks
+        import random
+        random.seed(19)
+
+        def cheapest(tensors, output, sizes):
+            if len(tensors) < 2:
+                return 0
+            best = None
+            for left, right in itertools.combinations(range(len(tensors)), 2):
+                rest = [labels for position, labels in enumerate(tensors) if position not in (left, right)]
+                others = set(''.join(''.join(labels) for labels in rest))
+                union = tensors[left] | tensors[right]
+                flops = _size(union, sizes) + cheapest(rest + [_keep(union, others, output)], output, sizes)
+                best = flops if best is None else min(best, flops)
+            return best
+
+        for trial in range(100):
+            labels = 'abcdefg'
+            sizes = {label: random.randint(2, 9) for label in labels}
+            inputs = [''.join(random.sample(labels, random.randint(1, 3))) for _ in range(random.randint(2, 5))]
+            used = sorted(set(''.join(inputs)))
+            output = ''.join(random.sample(used, random.randint(0, min(2, len(used)))))
+            with self.subTest(inputs=inputs, output=output):
+                expected = cheapest([frozenset(labels) for labels in inputs], output, sizes)
+                self.assertEqual(optimize_contraction(inputs, output, sizes, method='exact').flops, expected)
+                self.assertGreaterEqual(optimize_contraction(inputs, output, sizes, method='greedy').flops, expected)
+
+        sizes = {'a': 2, 'b': 3, 'c': 4, 'x': 100}
+        for method in ('exact', 'greedy'):
+            self.assertEqual(optimize_contraction(['abx', 'bc'], 'ac', sizes, method=method).flops, 2400)
+
+    def test_large_network(self):
+        # A ring of matrices is not a chain, and too large for the exact approach
+        labels = [chr(ord('a') + i) for i in range(20)]
+        inputs = [labels[i] + labels[(i + 1) % 20] for i in range(20)]
+        plan = optimize_contraction(inputs, '', {label: 3 for label in labels})
+        self.assertEqual(plan.method, 'greedy')
+        self.assertValidPlan(plan, inputs, '', {label: 3 for label in labels})
+
+
+if __name__ == '__main__':
+    unittest.main()
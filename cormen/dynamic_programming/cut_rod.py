@@ -1,3 +1,11 @@
+import collections
+import time
+
+try:
+  import numpy as np
+except ImportError:
+  np = None
+
 # A straightforward recursive approach
 def recursive(p, n):
   if n <= 0:
@@ -40,33 +48,332 @@ def top_down_imp(prices, total_length, optimals, dirty_cuts):
 
   return optimals[total_length-1]
 
+# An iterative top down approach: an explicit stack of pending lengths replaces
+# the recursion of top_down_imp, so long rods don't hit the recursion limit
+def top_down_iterative(prices, total_length, cache=None):
+  assert total_length <= len(prices), "Not enough prices to find an optimal solution"
+  memo = _TopDownMemo(prices) if cache is None else cache.memo(prices)
+
+  # A length is resolved once all the shorter ones are, just as top_down_imp
+  # dives into total_length-1 first
+  stack = [total_length]
+  while stack:
+    length = stack[-1]
+    if length <= memo.resolved:
+      stack.pop()
+    elif memo.resolved < length - 1:
+      stack.append(length - 1)
+    else:
+      memo.resolve(length)
+      stack.pop()
+
+  cuts = []
+  i = total_length
+  while i > 0:
+    cuts.append(int(memo.dirty_cuts[i-1]))
+    i = i - int(memo.dirty_cuts[i-1])
+
+  optima = memo.optimals[total_length-1] if total_length > 0 else 0
+  return (optima.item() if hasattr(optima, 'item') else optima, cuts)
+
+def _revenue_dtype(arrays, pieces):
+  # A dtype to promote prices to, so that revenues of up to the given number of
+  # pieces never overflow: float64, int64 or Python integers if int64 falls short
+  if any(a.dtype.kind == 'f' for a in arrays):
+    return np.float64
+  bound = pieces * sum(max(int(a.max()), -int(a.min())) for a in arrays if a.size)
+  return np.int64 if bound <= np.iinfo(np.int64).max else object
+
+class _TopDownMemo:
+  # Optimals and dirty cuts of a price table, lengths 1, ..., resolved are known.
+  # Numeric tables are kept in NumPy arrays to examine all the first pieces of
+  # a length at once
+  def __init__(self, prices):
+    self.resolved = 0
+    self.vectorized = np is not None and np.asarray(prices).dtype.kind in 'iuf'
+    if self.vectorized:
+      self.prices = np.asarray(prices)
+      self.prices = self.prices.astype(_revenue_dtype((self.prices, ), len(self.prices)))
+      self.optimals = np.zeros_like(self.prices)
+      self.dirty_cuts = np.zeros(len(self.prices), dtype=np.intp)
+    else:
+      self.prices = prices
+      self.optimals = [None for i in range(len(prices))]
+      self.dirty_cuts = [None for i in range(len(prices))]
+
+  def resolve(self, length):
+    assert self.resolved == length - 1
+    self.optimals[length-1] = self.prices[length-1]
+    self.dirty_cuts[length-1] = length
+    if not self.vectorized:
+      for i in range(1, length):
+        local = self.prices[i-1] + self.optimals[length-i-1]
+        if self.optimals[length-1] < local:
+          self.optimals[length-1] = local
+          self.dirty_cuts[length-1] = i
+    elif 1 < length:
+      # The i-th candidate is a first piece of length i + 1 and an optimal rest
+      # of length length - i - 1, argmax picks the first maximum as the loop does
+      locals_ = self.prices[:length-1] + self.optimals[length-2::-1]
+      i = int(locals_.argmax())
+      if self.optimals[length-1] < locals_[i]:
+        self.optimals[length-1] = locals_[i]
+        self.dirty_cuts[length-1] = i + 1
+    self.resolved = length
+
+class TopDownCache:
+  # A bounded LRU cache of memos for top_down_iterative keyed by a hash of the
+  # price table, so repeated queries against the same catalog reuse earlier work
+  def __init__(self, maxsize=128):
+    assert 0 < maxsize, "Cache size is assumed to be positive"
+    self.maxsize = maxsize
+    self.hits = 0
+    self.misses = 0
+    self._memos = collections.OrderedDict()
+
+  def memo(self, prices):
+    table = tuple(prices)
+    key = hash(table)
+    entry = self._memos.get(key)
+    if entry is not None and entry[0] == table:
+      self.hits = self.hits + 1
+      self._memos.move_to_end(key)
+      return entry[1]
+
+    self.misses = self.misses + 1
+    memo = _TopDownMemo(prices)
+    self._memos[key] = (table, memo)
+    self._memos.move_to_end(key)
+    while self.maxsize < len(self._memos):
+      self._memos.popitem(last=False)
+    return memo
+
+  def __len__(self):
+    return len(self._memos)
+
 # Bottom up approaches
 def costly_cuts(prices, cut_price, total_length):
   assert total_length <= len(prices), "Not enough prices to find an optimal solution"
   assert 0 <= cut_price, "Cut price is assumed to be positive"
 
-  optimals = [None for i in range(total_length)]
-  dirty_cuts = [None for i in range(total_length)]
-  for i in range(0, total_length):
-    optimals[i] = prices[i]
-    dirty_cuts[i] = i
+  optimals = []
+  dirty_cuts = []
+  extend_costly_cuts(prices, cut_price, total_length, optimals, dirty_cuts)
+
+  return (optimals[total_length-1] if total_length > 0 else 0,
+          unwind_cuts(dirty_cuts, total_length))
+
+def extend_costly_cuts(prices, cut_price, total_length, optimals, dirty_cuts):
+  # Extend tables of optimals and dirty cuts computed for the shorter rods up to
+  # the total length. Optimals of rods no longer than len(optimals) never
+  # depend on prices of longer pieces, so they stay valid as prices arrive
+  for i in range(len(optimals), total_length):
+    optimals.append(prices[i])
+    dirty_cuts.append(i)
     for j in range(0, i):
       test = prices[j] - cut_price + optimals[i-j-1]
       if optimals[i] < test:
         optimals[i] = test
         dirty_cuts[i] = j
-  
+
+def unwind_cuts(dirty_cuts, total_length):
   i = total_length
   cuts = []
   while i > 0:
     cuts.append(dirty_cuts[i-1] + 1)
     i = i - dirty_cuts[i-1] - 1
 
-  return (optimals[total_length-1], cuts)
+  return cuts
 
 def bottom_up(prices, total_length):
   return costly_cuts(prices, 0, total_length)
 
+# Structured approaches: prices of a particular shape admit faster solutions
+# - 'increasing_density': prices[i] / (i + 1) never decreases, so no cut can
+#   beat the whole rod, which is O(1)
+# - 'decreasing_density': prices[i] / (i + 1) never increases, so unit pieces
+#   are optimal provided cuts are free, which is O(n)
+# - 'concave': prices[i+1] - prices[i] never increases, so a later split point
+#   that beats an earlier one keeps beating it for longer rods and optimal
+#   split points are monotone, which gives O(n lg n)
+# Anything else falls back to the quadratic costly_cuts
+def detect_price_structure(prices, cut_price, total_length):
+  if all(prices[i] * (i + 2) <= prices[i+1] * (i + 1) for i in range(total_length - 1)):
+    return 'increasing_density'
+  if all(prices[i+1] - prices[i] <= prices[i] - prices[i-1] for i in range(1, total_length - 1)):
+    return 'concave'
+  if cut_price == 0 and \
+     all(prices[i+1] * (i + 1) <= prices[i] * (i + 2) for i in range(total_length - 1)):
+    return 'decreasing_density'
+  return None
+
+def structured_cuts(prices, cut_price, total_length, structure='auto'):
+  # The same as costly_cuts, given structure of the prices is either trusted
+  # or detected. The optima is the same, but among several optimal ways to cut
+  # the rod another one might be picked
+  assert total_length <= len(prices), "Not enough prices to find an optimal solution"
+  assert 0 <= cut_price, "Cut price is assumed to be positive"
+
+  if structure == 'auto':
+    structure = detect_price_structure(prices, cut_price, total_length)
+  if total_length <= 0:
+    return (0, [])
+
+  if structure == 'increasing_density':
+    return (prices[total_length-1], [total_length])
+  if structure == 'decreasing_density' and cut_price == 0:
+    return (prices[0] * total_length, [1] * total_length)
+  if structure == 'concave':
+    return concave_cuts(prices, cut_price, total_length)
+  return costly_cuts(prices, cut_price, total_length)
+
+def concave_cuts(prices, cut_price, total_length):
+  # A rod of length i is split into a rest of length j and a last piece of
+  # length i - j. The rest of length 0 stands for no cuts at all, its revenue
+  # is cut_price to make up for the cut price taken off the last piece
+  rests = [cut_price] + [None for i in range(total_length)]
+  last_pieces = [None for i in range(total_length + 1)]
+
+  def revenue(j, i):
+    return rests[j] + prices[i-j-1] - cut_price
+
+  # Split points j serving the lengths from start onwards, a later split point
+  # takes over from an earlier one once it is strictly better
+  candidates = collections.deque()
+  for i in range(1, total_length + 1):
+    # The split point i - 1 becomes available, drop the ones it dominates
+    j = i - 1
+    start = i
+    while candidates:
+      k, k_start = candidates[-1]
+      if revenue(k, max(k_start, i)) < revenue(j, max(k_start, i)):
+        candidates.pop()
+        continue
+
+      # Look for the first length, where the split point j beats k
+      low, high = max(k_start, i) + 1, total_length + 1
+      while low < high:
+        middle = (low + high) // 2
+        if revenue(k, middle) < revenue(j, middle):
+          high = middle
+        else:
+          low = middle + 1
+      start = low
+      break
+    if start <= total_length:
+      candidates.append((j, start))
+
+    # Retire split points, which served shorter rods only
+    while 1 < len(candidates) and candidates[1][1] <= i:
+      candidates.popleft()
+    k = candidates[0][0]
+    rests[i] = revenue(k, i)
+    last_pieces[i] = i - k
+
+  cuts = []
+  i = total_length
+  while i > 0:
+    cuts.append(last_pieces[i])
+    i = i - last_pieces[i]
+  cuts.reverse()
+
+  return (rests[total_length], cuts)
+
+# Batch approach: many price catalogs at once, every rod length is processed
+# for all the catalogs together by vectorized NumPy operations
+def batch_costly_cuts(prices, cut_prices, total_length=None):
+  # prices is a matrix with a catalog per row, cut_prices is either a single
+  # price or a price per row. Provides an array of optimas and a list of cuts
+  # per catalog, each matching costly_cuts(prices[r], cut_prices[r], total_length)
+  assert np is not None, "NumPy is required for the batch approach"
+  prices = np.asarray(prices)
+  assert prices.ndim == 2, "Prices are assumed to be a catalog per row"
+  catalogs = prices.shape[0]
+  if total_length is None:
+    total_length = prices.shape[1]
+  assert total_length <= prices.shape[1], "Not enough prices to find an optimal solution"
+  cut_prices = np.broadcast_to(np.asarray(cut_prices), (catalogs,))
+  assert (0 <= cut_prices).all(), "Cut price is assumed to be positive"
+
+  # Promote the prices before the cut price is taken off, so that neither
+  # unsigned differences wrap around nor revenues overflow
+  dtype = _revenue_dtype((prices[:, :total_length], cut_prices), total_length)
+  prices = prices[:, :total_length].astype(dtype)
+  cut_prices = cut_prices.astype(dtype)
+  optimals = np.zeros((catalogs, total_length), dtype=dtype)
+  dirty_cuts = np.zeros((catalogs, total_length), dtype=np.intp)
+  # Prices of the first pieces with the cut price taken off
+  cut_pieces = prices - cut_prices[:, None]
+  for i in range(total_length):
+    optimals[:, i] = prices[:, i]
+    dirty_cuts[:, i] = i
+    if i == 0:
+      continue
+
+    # The j-th candidate is a first piece of length j + 1 and an optimal rest
+    # of length i - j; argmax picks the first maximum just as costly_cuts does
+    candidates = cut_pieces[:, :i] + optimals[:, i-1::-1]
+    best = candidates.argmax(axis=1)
+    best_values = candidates[np.arange(catalogs), best]
+    better = optimals[:, i] < best_values
+    optimals[better, i] = best_values[better]
+    dirty_cuts[better, i] = best[better]
+
+  # Unwind cuts of all the catalogs together, a piece per catalog per step
+  rows = np.arange(catalogs)
+  remaining = np.full(catalogs, total_length)
+  cuts = [[] for r in range(catalogs)]
+  active = rows[0 < remaining]
+  while active.size:
+    pieces = dirty_cuts[active, remaining[active] - 1] + 1
+    for r, piece in zip(active.tolist(), pieces.tolist()):
+      cuts[r].append(piece)
+    remaining[active] -= pieces
+    active = active[0 < remaining[active]]
+
+  optimas = optimals[:, total_length-1] if total_length > 0 else np.zeros(catalogs, dtype=dtype)
+  return (optimas, cuts)
+
+def batch_bottom_up(prices, total_length=None):
+  return batch_costly_cuts(prices, 0, total_length)
+
+# All-lengths solver: a single bottom up pass answers queries for every
+# length up to the longest one seen so far
+class RodCutter:
+  def __init__(self, prices, cut_price=0, total_length=None):
+    assert 0 <= cut_price, "Cut price is assumed to be positive"
+    self.prices = list(prices)
+    self.cut_price = cut_price
+    self.optimals = []
+    self.dirty_cuts = []
+    self.extend(len(self.prices) if total_length is None else total_length)
+
+  def add_prices(self, prices):
+    # Append prices of longer pieces, optimals computed so far stay valid
+    self.prices.extend(prices)
+
+  def extend(self, total_length):
+    # Make sure optimals are known for every length up to the total length
+    assert total_length <= len(self.prices), "Not enough prices to find an optimal solution"
+    extend_costly_cuts(self.prices, self.cut_price, total_length,
+                       self.optimals, self.dirty_cuts)
+
+  def optima(self, total_length):
+    # O(1) unless the table has to be extended first
+    if len(self.optimals) < total_length:
+      self.extend(total_length)
+    return self.optimals[total_length-1] if total_length > 0 else 0
+
+  def cuts(self, total_length):
+    # O(number of cuts) unless the table has to be extended first
+    if len(self.optimals) < total_length:
+      self.extend(total_length)
+    return unwind_cuts(self.dirty_cuts, total_length)
+
+  def solve(self, total_length):
+    # The same as costly_cuts(prices, cut_price, total_length)
+    return (self.optima(total_length), self.cuts(total_length))
+
 # A sub-optimal greedy approach
 def max_density(prices, total_length):
   density = [prices[i] / (i + 1) for i in range(total_length)]
@@ -85,7 +392,9 @@ def max_density(prices, total_length):
 
 def test(p, c):
   print("\np = ", p, "c =", c)
+  cutter = RodCutter(p, c)
   for n in range(1, len(p) + 1):
+    assert cutter.solve(n) == costly_cuts(p, c, n)
     print("Optimal solution for n =", n, "is\n\t",
           "recursive =", recursive(p, n),
           "top_down =", top_down(p, n),
@@ -93,10 +402,101 @@ def test(p, c):
           "max_density =", max_density(p, n),
           "costly_cuts =", costly_cuts(p, c, n))
 
-# Test 1
-p = [1, 5, 8, 9, 10, 17, 17, 20, 24, 30]
-test(p, 2)
+def benchmark(catalogs=1000, total_length=100, seed=0):
+  # Compares the batch approach against looping bottom_up over the catalogs
+  rng = np.random.default_rng(seed)
+  prices = rng.integers(1, 10 * total_length, size=(catalogs, total_length)).cumsum(axis=1)
+  rows = prices.tolist()
+
+  start = time.perf_counter()
+  looped = [bottom_up(row, total_length) for row in rows]
+  looped_elapsed = time.perf_counter() - start
+
+  start = time.perf_counter()
+  optimas, cuts = batch_bottom_up(prices, total_length)
+  batch_elapsed = time.perf_counter() - start
+
+  assert looped == list(zip(optimas.tolist(), cuts))
+  print("catalogs =", catalogs, "total_length =", total_length,
+        "bottom_up loop =", format(looped_elapsed, '.4f') + "s",
+        "batch =", format(batch_elapsed, '.4f') + "s",
+        "speedup =", format(looped_elapsed / batch_elapsed, '.1f') + "x")
+
+if __name__ == '__main__':
+  import sys
+
+  # Test 1
+  p = [1, 5, 8, 9, 10, 17, 17, 20, 24, 30]
+  test(p, 2)
+
+  # Test 2
+  p = [1, 1, 100, 1, 1, 1, 1, 1, 1, 1]
+  test(p, 2)
+
+  # Test 3
+  p = [1, 5, 8, 9, 10, 17, 17, 20, 24, 30]
+  cutter = RodCutter(p[:4])
+  assert cutter.solve(4) == bottom_up(p, 4)
+  cutter.add_prices(p[4:])
+  for n in range(len(p), 0, -1):
+    assert cutter.solve(n) == bottom_up(p, n)
+
+  # Test 4
+  if np is not None:
+    catalogs = [[1, 5, 8, 9, 10, 17, 17, 20, 24, 30], [1, 1, 100, 1, 1, 1, 1, 1, 1, 1],
+                [3, 3, 3, 3, 3, 3, 3, 3, 3, 3], [0, 0, 0, 0, 0, 0, 0, 0, 0, 1]]
+    for c in (0, 2, [0, 2, 1, 3]):
+      cs = c if isinstance(c, list) else [c] * len(catalogs)
+      for n in range(0, 11):
+        optimas, cuts = batch_costly_cuts(catalogs, c, n)
+        for r in range(len(catalogs)):
+          assert (optimas[r], cuts[r]) == costly_cuts(catalogs[r], cs[r], n)
+
+  # Test 5
+  for p in ([1, 5, 8, 9, 10, 17, 17, 20, 24, 30], [1, 1, 100, 1, 1, 1, 1, 1, 1, 1],
+            [1.5, 3.0, 4.5, 6.0], [10 ** 30, 2 * 10 ** 30 + 1, 3 * 10 ** 30]):
+    cache = TopDownCache(maxsize=1)
+    for n in range(len(p), -1, -1):
+      assert top_down_iterative(p, n) == top_down_iterative(p, n, cache) == top_down(p, n)
+    assert cache.misses == 1 and cache.hits == len(p)
+  p = [i + (i % 7 == 0) for i in range(1, 2001)]
+  optima, cuts = top_down_iterative(p, len(p))
+  assert optima == bottom_up(p, len(p))[0] and sum(cuts) == len(p)
+
+  # Test 6
+  import random
+  random.seed(6)
+  for trial in range(200):
+    n = random.randint(1, 40)
+    steps = sorted((random.randint(0, 20) for i in range(n)), reverse=True)
+    concave = [sum(steps[:i+1]) for i in range(n)]
+    for p in (concave, [x * x for x in range(1, n + 1)], [random.randint(1, 50) for i in range(n)]):
+      for c in (0, 1, 7):
+        optima, cuts = structured_cuts(p, c, n)
+        assert optima == costly_cuts(p, c, n)[0] and sum(cuts) == n
+        assert optima == sum(p[k-1] for k in cuts) - c * (len(cuts) - 1)
+  assert detect_price_structure([x * x for x in range(1, 11)], 2, 10) == 'increasing_density'
+  assert detect_price_structure([1, 5, 8, 9, 10, 17, 17, 20, 24, 30], 2, 10) is None
+
+  # Test 7
+  for p in ([2 ** 62, 2 ** 62 + 1], [100, 150, 220], [3 * 10 ** 6] * 2000):
+    expected = bottom_up(p, len(p))[0]
+    assert top_down_iterative(p, len(p))[0] == expected
+    if np is not None:
+      for dtype in (np.uint8, np.int32, np.float32):
+        if np.can_cast(np.min_scalar_type(max(p)), dtype):
+          assert top_down_iterative(np.array(p, dtype=dtype), len(p))[0] == expected
+
+  # Test 8
+  if np is not None:
+    for p, c in (([10 ** 9, 2 * 10 ** 9, 2 * 10 ** 9], 0), ([200, 250, 255], 3), ([100, 150, 220], 250),
+                 ([2 ** 62, 2 ** 62 + 1], 0), ([2 ** 62, 2 ** 63 - 1], 1)):
+      for dtype in (np.uint8, np.int32, np.int64, np.uint64):
+        if np.can_cast(np.min_scalar_type(max(p + [c])), dtype):
+          for n in range(len(p) + 1):
+            optimas, cuts = batch_costly_cuts(np.array([p], dtype=dtype), np.array([c], dtype=dtype), n)
+            assert (optimas[0], cuts[0]) == costly_cuts(p, c, n)
 
-# Test 2
-p = [1, 1, 100, 1, 1, 1, 1, 1, 1, 1]
-test(p, 2)
\ No newline at end of file
+  if '--benchmark' in sys.argv:
+    for total_length in (10, 100, 500):
+      benchmark(total_length=total_length)
@@ -2,8 +2,41 @@
 # F0 = 0
 # F1 = 1
 # Fi = Fi-1 + Fi-2
-# in O(n)-time dynamic programming algorithm
-def ith_fibonacci(i):
+# Several engines are available through the method selector:
+# - 'linear' is the O(n)-time dynamic programming algorithm
+# - 'doubling' is the O(lg n)-step fast doubling algorithm, which relies on
+#   F2k = Fk * (2 * Fk+1 - Fk)
+#   F2k+1 = Fk^2 + Fk+1^2
+# - 'matrix' is the O(lg n)-step exponentiation of the [[1, 1], [1, 0]] matrix
+# All of them are exact, since Python integers have arbitrary precision
+#
+# The batch API computes Fi mod m for many indices at once. Fibonacci numbers
+# modulo m are periodic (the period is known as the Pisano period), so indices
+# are reduced by the period first, provided there are enough indices to pay
+# for finding it, and then the distinct reduced indices are visited in
+# ascending order, each one reached from the previous one. Arrays of indices
+# under a modulus below 2^32 are computed by vectorized NumPy operations
+# instead, adding up Fibonacci numbers tabulated for the digits of the indices
+import collections
+import math
+import time
+
+try:
+  import numpy as np
+except ImportError:
+  np = None
+
+def ith_fibonacci(i, method='doubling'):
+  assert 0 <= i, "Fibonacci numbers are defined for non-negative indices only"
+  try:
+    engine = _ENGINES[method]
+  except KeyError:
+    raise ValueError("Unknown method '" + str(method) + "', expected one of " +
+                     str(sorted(_ENGINES)))
+
+  return engine(i)
+
+def _linear(i):
   if i == 0:
     return 0
   if i == 1:
@@ -20,10 +53,399 @@ def ith_fibonacci(i):
 
   return ith
 
-# Test 1
-for i in range(11):
-  print(i, "-th Fibonacci number is ", ith_fibonacci(i), sep = '')
+def _doubling_pair(i, modulus=None):
+  # Walk bits of i from the most significant one, keeping (Fk, Fk+1) for the
+  # prefix k of the bits seen so far
+  fk, fk1 = 0, 1
+  for bit in bin(i)[2:]:
+    f2k = fk * (2 * fk1 - fk)
+    f2k1 = fk * fk + fk1 * fk1
+    if bit == '1':
+      fk, fk1 = f2k1, f2k + f2k1
+    else:
+      fk, fk1 = f2k, f2k1
+    if modulus is not None:
+      fk, fk1 = fk % modulus, fk1 % modulus
+
+  if modulus is not None:
+    # Keep the pair reduced even when the loop above did not run (i = 0)
+    fk, fk1 = fk % modulus, fk1 % modulus
+  return (fk, fk1)
+
+def _doubling(i):
+  return _doubling_pair(i)[0]
+
+def _matrix(i):
+  # [[Fk+1, Fk], [Fk, Fk-1]] is the k-th power of [[1, 1], [1, 0]], the matrix
+  # is symmetrical, so only three of its elements are tracked
+  def mult(x, y):
+    a = x[0] * y[0] + x[1] * y[1]
+    b = x[0] * y[1] + x[1] * y[2]
+    c = x[1] * y[1] + x[2] * y[2]
+    return (a, b, c)
+
+  result = (1, 0, 1)
+  power = (1, 1, 0)
+  while i:
+    if i & 1:
+      result = mult(result, power)
+    power = mult(power, power)
+    i = i >> 1
+
+  return result[1]
+
+_ENGINES = {'linear': _linear, 'doubling': _doubling, 'matrix': _matrix}
+
+# Reduction of indices relies on a factorization of the modulus by trial
+# division with divisors up to this limit, moduli that can't be factored this
+# way are used without any reduction
+_TRIAL_DIVISION_LIMIT = 10 ** 6
+
+# Pisano periods that are short enough get tabulated in full, so a query
+# becomes a lookup. A table pays off only if the queries sharing the modulus
+# would take longer by fast doubling, i.e. count * log(period) > period
+_TABLE_LIMIT = 1 << 22
+
+# The number of the most recently used tables and periods to keep
+_TABLE_CACHE_SIZE = 8
+_PERIOD_CACHE_SIZE = 1024
+
+# Gaps between consecutive sorted indices up to this limit are walked by
+# additions, longer ones are jumped over by means of fast doubling
+_STEP_LIMIT = 32
+
+# Caches shared by all the batch calls: modulus -> Pisano period (None if it
+# is unknown), modulus -> [F0 mod m, F1 mod m, ...] over the whole period and
+# modulus -> the same table as a NumPy array. Entries are evicted in the least
+# recently used order
+_PISANO_PERIODS = collections.OrderedDict()
+_PISANO_TABLES = collections.OrderedDict()
+_PISANO_ARRAYS = collections.OrderedDict()
+
+def _factorize(n):
+  # Provides {prime: power} for n, or None if n has a factor beyond reach of
+  # the trial division
+  factors = {}
+  d = 2
+  while d * d <= n:
+    if _TRIAL_DIVISION_LIMIT < d:
+      return None
+    while n % d == 0:
+      factors[d] = factors.get(d, 0) + 1
+      n = n // d
+    d = d + 1 if d == 2 else d + 2
+  if 1 < n:
+    factors[n] = factors.get(n, 0) + 1
+
+  return factors
+
+def _prime_pisano_period(p):
+  if p == 2:
+    return 3
+  if p == 5:
+    return 20
+
+  # The period divides p - 1 if p = +-1 (mod 5) and 2 * (p + 1) otherwise,
+  # so strip prime factors off that bound while it stays a period
+  period = p - 1 if p % 5 in (1, 4) else 2 * (p + 1)
+  factors = _factorize(period)
+  if factors is None:
+    return None
+  for q in factors:
+    while period % q == 0 and _doubling_pair(period // q, p) == (0, 1):
+      period = period // q
+
+  return period
+
+def pisano_period(modulus):
+  # Provides the period of Fibonacci numbers modulo given modulus, or None if
+  # it can't be found cheaply. The result is cached per modulus
+  assert 0 < modulus, "Modulus is assumed to be positive"
+  return _cached(_PISANO_PERIODS, modulus, lambda: _find_pisano_period(modulus), _PERIOD_CACHE_SIZE)
+
+def _find_pisano_period(modulus):
+  # The period of a composite modulus is the lcm of the periods of its prime
+  # powers, and the period of p^k is p^(k-1) times the period of p
+  period = 1
+  factors = _factorize(modulus)
+  for p, k in (factors or {}).items():
+    prime_period = _prime_pisano_period(p)
+    if prime_period is None:
+      factors = None
+      break
+    prime_period = prime_period * p ** (k - 1)
+    period = period * prime_period // math.gcd(period, prime_period)
+  if factors is None:
+    period = None
+  else:
+    # Any multiple of the true period is fine to reduce indices by
+    assert _doubling_pair(period, modulus) == (0, 1 % modulus)
+
+  return period
+
+def _cached(cache, modulus, build, size=_TABLE_CACHE_SIZE):
+  # Looks the modulus up in an LRU cache, building a missing entry
+  if modulus in cache:
+    cache.move_to_end(modulus)
+  else:
+    cache[modulus] = build()
+    if size < len(cache):
+      cache.popitem(last=False)
+
+  return cache[modulus]
+
+def _worth_reducing(count, modulus, bits):
+  # Whether count queries of up to the given number of bits sharing the modulus
+  # pay for finding the Pisano period: the trial division takes up to sqrt(m)
+  # steps, while the reduction saves up to bits doubling steps per query
+  if modulus is None:
+    return False
+  return (modulus in _PISANO_PERIODS or
+          min(math.isqrt(modulus), _TRIAL_DIVISION_LIMIT) < count * bits)
+
+def _worth_tabulating(count, modulus, period):
+  # Whether count queries sharing the modulus are served by a table
+  if period is None or _TABLE_LIMIT < period:
+    return False
+  return (modulus in _PISANO_TABLES or modulus in _PISANO_ARRAYS or
+          period < count * period.bit_length())
+
+def _pisano_table(modulus, period):
+  def build():
+    table = [0] * period
+    fk, fk1 = 0, 1 % modulus
+    for k in range(period):
+      table[k] = fk
+      fk, fk1 = fk1, (fk + fk1) % modulus
+    return table
+
+  return _cached(_PISANO_TABLES, modulus, build)
+
+def _pisano_array(modulus, period):
+  def build():
+    dtype = np.int64 if modulus <= np.iinfo(np.int64).max else object
+    return np.array(_pisano_table(modulus, period), dtype=dtype)
+
+  return _cached(_PISANO_ARRAYS, modulus, build)
+
+def _walk_sorted(indices, modulus):
+  # Computes {i: Fi (mod m)} for given ascending distinct indices, reaching
+  # every index from the previous one
+  results = {}
+  k, fk, fk1 = 0, 0, 1
+  for i in indices:
+    gap = i - k
+    if gap <= _STEP_LIMIT:
+      for _ in range(gap):
+        fk, fk1 = fk1, fk + fk1
+    else:
+      # Fk+d = Fk * Fd+1 + (Fk+1 - Fk) * Fd
+      # Fk+d+1 = Fk+1 * Fd+1 + Fk * Fd
+      fd, fd1 = _doubling_pair(gap, modulus)
+      fk, fk1 = fk * fd1 + (fk1 - fk) * fd, fk1 * fd1 + fk * fd
+    if modulus is not None:
+      fk, fk1 = fk % modulus, fk1 % modulus
+    k = i
+    results[i] = fk
+
+  return results
+
+def _batch_for_modulus(indices, modulus):
+  # Computes Fi (mod m) for a list of indices sharing the same modulus
+  period = None
+  if _worth_reducing(len(indices), modulus, max(indices, default=0).bit_length()):
+    period = pisano_period(modulus)
+  if period is not None:
+    indices = [i % period for i in indices]
+    if _worth_tabulating(len(indices), modulus, period):
+      table = _pisano_table(modulus, period)
+      return [table[i] for i in indices]
+
+  results = _walk_sorted(sorted(set(indices)), modulus)
+  return [results[i] for i in indices]
+
+def _batch_for_modulus_numpy(indices, modulus):
+  # The same as above for an array of indices, the table lookup is vectorized
+  period = None
+  if _worth_reducing(indices.size, modulus, int(indices.max(initial=0)).bit_length()):
+    period = pisano_period(modulus)
+  if _worth_tabulating(indices.size, modulus, period):
+    return _pisano_array(modulus, period)[indices % period]
+
+  if period is not None and period <= np.iinfo(np.int64).max:
+    indices = indices % period
+  elif period is not None:
+    # The period doesn't fit NumPy integers, so reduce Python integers
+    indices = indices.astype(object) % period
+  if indices.dtype != object and modulus < _NUMPY_MODULUS_LIMIT:
+    return _digits_numpy(indices, modulus)
+
+  unique, inverse = np.unique(indices, return_inverse=True)
+  results = _walk_sorted([int(i) for i in unique], modulus)
+  dtype = np.int64 if modulus <= np.iinfo(np.int64).max else object
+  values = np.array([results[int(i)] for i in unique], dtype=dtype)
+  return values[inverse.reshape(-1)]
+
+# Residues below this limit are multiplied in uint64 without overflow
+_NUMPY_MODULUS_LIMIT = 1 << 32
+
+# Indices of a NumPy array are split into digits of this many bits
+_DIGIT_BITS = 8
+
+def _add_pairs(fa, fa1, fb, fb1, modulus):
+  # (Fa+b, Fa+b+1) mod m from (Fa, Fa+1) and (Fb, Fb+1), for Python integers
+  # and uint64 arrays alike:
+  # Fa+b = Fa * Fb+1 + (Fa+1 - Fa) * Fb
+  # Fa+b+1 = Fa+1 * Fb+1 + Fa * Fb
+  fab = (fa * fb1 % modulus + (fa1 + modulus - fa) % modulus * fb % modulus) % modulus
+  fab1 = (fa1 * fb1 % modulus + fa * fb % modulus) % modulus
+  return (fab, fab1)
+
+def _digits_numpy(indices, modulus):
+  # Computes Fi mod m for all the indices at once: (Fd*2^s, Fd*2^s+1) is looked
+  # up for every digit d at the shift s, and the pairs of the digits of an
+  # index are added up, so a 64-bit index takes 7 additions instead of 64
+  # doubling steps
+  indices = indices.astype(np.uint64)
+  m = np.uint64(modulus)
+  fk = np.zeros(indices.shape, dtype=np.uint64)
+  fk1 = np.full(indices.shape, 1 % modulus, dtype=np.uint64)
+  mask = np.uint64((1 << _DIGIT_BITS) - 1)
+  for shift in range(0, int(indices.max(initial=0)).bit_length(), _DIGIT_BITS):
+    fs, fs1 = _doubling_pair(1 << shift, modulus)
+    table, table1 = [0], [1 % modulus]
+    for d in range(1, 1 << _DIGIT_BITS):
+      fd, fd1 = _add_pairs(table[-1], table1[-1], fs, fs1, modulus)
+      table.append(fd)
+      table1.append(fd1)
+
+    digits = (indices >> np.uint64(shift)) & mask
+    fd, fd1 = np.array(table, dtype=np.uint64)[digits], np.array(table1, dtype=np.uint64)[digits]
+    fk, fk1 = (fd, fd1) if shift == 0 else _add_pairs(fk, fk1, fd, fd1, m)
+
+  return fk.astype(np.int64)
+
+def ith_fibonacci_batch(indices, modulus=None):
+  # Computes Fi (or Fi mod m) for every index i in given iterable of indices.
+  # The modulus is either a single positive integer for all the indices, or an
+  # iterable of moduli, one per index. A NumPy array is returned whenever the
+  # indices or the moduli are given as NumPy arrays, a list otherwise
+  as_numpy = np is not None and (isinstance(indices, np.ndarray) or
+                                 isinstance(modulus, np.ndarray))
+  if as_numpy:
+    indices = np.asarray(indices).reshape(-1)
+    assert indices.size == 0 or 0 <= indices.min(), \
+      "Fibonacci numbers are defined for non-negative indices only"
+  else:
+    indices = [int(i) for i in indices]
+    assert all(0 <= i for i in indices), \
+      "Fibonacci numbers are defined for non-negative indices only"
+
+  if modulus is None:
+    results = _batch_for_modulus([int(i) for i in indices], None)
+    return np.array(results, dtype=object) if as_numpy else results
+
+  if isinstance(modulus, int) or (np is not None and isinstance(modulus, np.integer)):
+    modulus = int(modulus)
+    if as_numpy and indices.dtype != object:
+      return _batch_for_modulus_numpy(indices, modulus)
+    results = _batch_for_modulus([int(i) for i in indices], modulus)
+    return np.array(results) if as_numpy else results
+
+  # Group indices by their moduli so that each group shares one period
+  moduli = [int(m) for m in modulus]
+  assert len(moduli) == len(indices), "Expected a modulus per index"
+  groups = {}
+  for position, m in enumerate(moduli):
+    groups.setdefault(m, []).append(position)
+
+  results = [None] * len(moduli)
+  for m, positions in groups.items():
+    values = _batch_for_modulus([int(indices[p]) for p in positions], m)
+    for p, value in zip(positions, values):
+      results[p] = value
+
+  if as_numpy:
+    dtype = np.int64 if max(moduli, default=1) <= np.iinfo(np.int64).max else object
+    return np.array(results, dtype=dtype)
+  return results
+
+def benchmark(max_power=7, methods=('linear', 'doubling', 'matrix'), budget=10):
+  # Time every method for i = 10^1, 10^2, ..., 10^max_power. A method is
+  # dropped from the following rounds as soon as a single call exceeds the
+  # budget in seconds, since the linear loop needs minutes for the largest i
+  active = list(methods)
+  for power in range(1, max_power + 1):
+    i = 10 ** power
+    timings = []
+    for method in list(active):
+      start = time.perf_counter()
+      ith_fibonacci(i, method)
+      elapsed = time.perf_counter() - start
+      timings.append(method + " = " + format(elapsed, '.6f') + "s")
+      if budget < elapsed:
+        active.remove(method)
+    print("i = 10^", power, ": ", ", ".join(timings), sep = '')
+
+if __name__ == '__main__':
+  import sys
+
+  # Test 1
+  for i in range(11):
+    print(i, "-th Fibonacci number is ", ith_fibonacci(i), sep = '')
+
+  # Test 2
+  for method in _ENGINES:
+    assert(ith_fibonacci(130, method) == 659034621587630041982498215)
+    assert(ith_fibonacci(428, method) == 125090700579089545268174422433569433531336921195894847055310250098200676237081739043824861)
+
+  # Test 3
+  for i in range(300):
+    assert(ith_fibonacci(i, 'linear') == ith_fibonacci(i, 'doubling') == ith_fibonacci(i, 'matrix'))
+  assert(ith_fibonacci(10 ** 5) == ith_fibonacci(10 ** 5, 'linear'))
+
+  # Test 4
+  indices = [0, 1, 2, 10, 5, 10 ** 6, 428, 7, 10 ** 15 + 3]
+  for m in (None, 1, 2, 10, 1000, 10 ** 9 + 7, 2 ** 61 - 1):
+    expected = [ith_fibonacci(i) if i < 10 ** 7 else None for i in indices]
+    if m is None:
+      # The last number is too large to compute without a modulus
+      assert(ith_fibonacci_batch(indices[:-1]) == expected[:-1])
+      continue
+
+    expected = [None if f is None else f % m for f in expected]
+    expected[-1] = _doubling_pair(indices[-1], m)[0]
+    assert(ith_fibonacci_batch(indices, [m] * len(indices)) == expected)
+    assert(ith_fibonacci_batch(indices, m) == expected)
+    if np is not None:
+      assert(list(ith_fibonacci_batch(np.array(indices), m)) == expected)
+  assert(pisano_period(10) == 60 and pisano_period(1000) == 1500)
+
+  # Test 5
+  moduli = [10 ** 6 + k for k in range(20)]
+  indices = [10 ** 12 + k for k in range(20)]
+  assert(ith_fibonacci_batch(indices, moduli) ==
+         [_doubling_pair(i, m)[0] for i, m in zip(indices, moduli)])
+  assert(len(_PISANO_TABLES) <= _TABLE_CACHE_SIZE)
+  assert(all(m not in _PISANO_TABLES for m in moduli))
+  assert(ith_fibonacci_batch(list(range(200)) * 1000, 10) == [ith_fibonacci(i) % 10 for i in range(200)] * 1000)
+  assert(10 in _PISANO_TABLES)
+
+  # Test 6
+  moduli = [10 ** 12 + 39 + 2 * k for k in range(2000)]
+  assert(ith_fibonacci_batch([10 ** 12] * len(moduli), moduli) ==
+         [_doubling_pair(10 ** 12, m)[0] for m in moduli])
+  for m in moduli:
+    pisano_period(m % 10 ** 4 + 1)
+  assert(len(_PISANO_PERIODS) <= _PERIOD_CACHE_SIZE)
+  if np is not None:
+    assert(list(ith_fibonacci_batch(np.array([10 ** 15, 7]), 2 ** 70)) ==
+           ith_fibonacci_batch([10 ** 15, 7], 2 ** 70) == [_doubling_pair(10 ** 15, 2 ** 70)[0], 13])
+    indices = np.random.default_rng(6).integers(0, 2 ** 62, size=1000)
+    for m in (1, 2, 10 ** 9 + 7, 2 ** 32 - 5):
+      expected = [_doubling_pair(int(i), m)[0] for i in indices]
+      assert(list(ith_fibonacci_batch(indices, m)) == expected)
+      assert(list(_digits_numpy(indices, m)) == expected)
 
-# Test 2
-assert(ith_fibonacci(130) == 659034621587630041982498215)
-assert(ith_fibonacci(428) == 125090700579089545268174422433569433531336921195894847055310250098200676237081739043824861)
\ No newline at end of file
+  if '--benchmark' in sys.argv:
+    benchmark()
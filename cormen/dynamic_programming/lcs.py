@@ -15,8 +15,18 @@ For example, if X = <A, B, C, B, D, A, B> and Y = <B, D, C, A, B, A>, both seque
 are LCS of X and Y? since X and Y have no common subsequence of length 5 or greater.
 """
 
+import bisect
+import collections
+import random
+import sys
+import time
 import unittest
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
 
 def unwind_lcs(sequence_x, sequence_y, lcs_ij):
     i = len(sequence_x)
@@ -26,10 +36,10 @@ def unwind_lcs(sequence_x, sequence_y, lcs_ij):
 
     lcs = []
     while 0 < i and 0 < j:
-        # If the last elements of the Xi and the Yj prefixes match, add it at the beginning of the LCS
+        # If the last elements of the Xi and the Yj prefixes match, add it to the LCS, which is collected backwards
         # Otherwise keep shortening appropriate prefixes to move on to the next element of the LCS
         if sequence_x[i - 1] == sequence_y[j - 1]:
-            lcs.insert(0, sequence_x[i - 1])
+            lcs.append(sequence_x[i - 1])
             i = i - 1
             j = j - 1
         elif lcs_ij[i][j] == lcs_ij[i - 1][j]:
@@ -38,6 +48,7 @@ def unwind_lcs(sequence_x, sequence_y, lcs_ij):
             assert lcs_ij[i][j] == lcs_ij[i][j - 1]
             j = j - 1
     assert lcs_ij[len(sequence_x)][len(sequence_y)] == len(lcs)
+    lcs.reverse()
 
     return lcs
 
@@ -105,6 +116,448 @@ def find_lcs_recursively(sequence_x, sequence_y):
     return unwind_lcs(sequence_x, sequence_y, lcs_ij)
 
 
+def find_lcs_numpy(sequence_x, sequence_y):
+    # Fill the same matrix as find_lcs does, but as a NumPy array of the narrowest unsigned type, that fits
+    # min(m, n), the longest possible LCS. Cells of an anti-diagonal i + j = d depend on the two previous anti-diagonals
+    # only, so each anti-diagonal is filled at once. In the flattened matrix an anti-diagonal is a slice with the step
+    # n, and so are its neighbours above, to the left and above to the left
+    assert np is not None, "NumPy is required for the vectorized approach"
+    m = len(sequence_x)
+    n = len(sequence_y)
+    dtype = np.uint16 if min(m, n) <= np.iinfo(np.uint16).max else np.uint32
+    lcs_ij = np.zeros((m + 1, n + 1), dtype=dtype)
+
+    # Encode elements by integers to compare them in vectorized fashion
+    codes = {}
+    codes_x = np.array([codes.setdefault(x_i, len(codes)) for x_i in sequence_x], dtype=np.int64)
+    codes_y = np.array([codes.setdefault(y_j, len(codes)) for y_j in sequence_y], dtype=np.int64)
+    reversed_y = codes_y[::-1]
+
+    cells = lcs_ij.reshape(-1)
+    width = n + 1
+    for d in range(2, m + n + 1):
+        i_begin = max(1, d - n)
+        i_end = min(m, d - 1) + 1
+        if i_end <= i_begin:
+            continue
+
+        # The cell (i, j) is at i * (n + 1) + j, the next one of the anti-diagonal is at (i + 1, j - 1)
+        first = i_begin * width + d - i_begin
+        last = (i_end - 1) * width + d - i_end + 1
+        diagonal = slice(first, last + 1, n)
+        above_left = cells[first - width - 1:last - width:n]
+        above = cells[first - width:last - width + 1:n]
+        left = cells[first - 1:last:n]
+
+        # The j-th element of Y is the (n - 1 - j)-th one of reversed Y, and j = d - i
+        matches = codes_x[i_begin - 1:i_end - 1] == reversed_y[n - d + i_begin:n - d + i_end]
+        cells[diagonal] = np.where(matches, above_left + 1, np.maximum(above, left))
+
+    # Reconstruct an LCS for the initial sequences
+    return unwind_lcs(sequence_x, sequence_y, lcs_ij)
+
+
+def find_lcs_length(sequence_x, sequence_y):
+    # Use the same recurrence as find_lcs, but keep only two rolling rows of the matrix, each as long as the shorter
+    # sequence, since the length of an LCS is in the last cell
+    if len(sequence_x) < len(sequence_y):
+        sequence_x, sequence_y = sequence_y, sequence_x
+
+    return _lcs_row(sequence_x, 0, len(sequence_x), sequence_y, 0, len(sequence_y))[-1]
+
+
+def _lcs_row(sequence_x, x_begin, x_end, sequence_y, y_begin, y_end, backward=False):
+    # Provide lengths of LCSes of X[x_begin:x_end] and each prefix Y[y_begin:y_begin + k] of Y[y_begin:y_end], or of
+    # each suffix Y[y_end - k:y_end] if going backward, keeping just two rows of the matrix
+    x_indices = range(x_begin, x_end)
+    y_indices = range(y_begin, y_end)
+    if backward:
+        x_indices = reversed(x_indices)
+        y_indices = y_indices[::-1]
+
+    previous = [0] * (y_end - y_begin + 1)
+    current = [0] * (y_end - y_begin + 1)
+    for i in x_indices:
+        x_i = sequence_x[i]
+        for k, j in enumerate(y_indices):
+            if x_i == sequence_y[j]:
+                current[k + 1] = previous[k] + 1
+            elif current[k] <= previous[k + 1]:
+                current[k + 1] = previous[k + 1]
+            else:
+                current[k + 1] = current[k]
+        previous, current = current, previous
+
+    return previous
+
+
+def find_lcs_hirschberg(sequence_x, sequence_y):
+    # Find the same LCS as find_lcs does, but in O(min(m, n)) memory by means of the Hirschberg's divide and conquer:
+    # split the longer sequence in halves, find the split of the shorter one the LCS passes through from the last rows
+    # of the forward and the backward matrices, and recurse on both pairs of halves.
+    # Choosing the last split (or the first one, if sequences swap roles) among the optimal ones follows the same path
+    # through the matrix, which unwind_lcs takes
+    lcs = []
+    if len(sequence_y) <= len(sequence_x):
+        _find_lcs_hirschberg_impl(sequence_x, 0, len(sequence_x), sequence_y, 0, len(sequence_y), True, lcs)
+    else:
+        _find_lcs_hirschberg_impl(sequence_y, 0, len(sequence_y), sequence_x, 0, len(sequence_x), False, lcs)
+
+    return lcs
+
+
+def _find_lcs_hirschberg_impl(sequence_x, x_begin, x_end, sequence_y, y_begin, y_end, as_is, lcs):
+    # Append an LCS of X[x_begin:x_end] and Y[y_begin:y_end] to the LCS, X is split while Y rows are kept in memory.
+    # Unless the sequences are taken as is, they are swapped with respect to the caller, so an element of Y is reported
+    if x_begin == x_end or y_begin == y_end:
+        return
+
+    if x_end - x_begin == 1:
+        # A single element of X contributes to the LCS if Y contains it
+        for j in range(y_begin, y_end):
+            if sequence_x[x_begin] == sequence_y[j]:
+                lcs.append(sequence_x[x_begin] if as_is else sequence_y[j])
+                break
+        return
+
+    x_middle = (x_begin + x_end) // 2
+    forward = _lcs_row(sequence_x, x_begin, x_middle, sequence_y, y_begin, y_end)
+    backward = _lcs_row(sequence_x, x_middle, x_end, sequence_y, y_begin, y_end, backward=True)
+    n = y_end - y_begin
+    totals = [forward[k] + backward[n - k] for k in range(n + 1)]
+    best = max(totals)
+    if as_is:
+        k = n - totals[::-1].index(best)
+    else:
+        k = totals.index(best)
+
+    _find_lcs_hirschberg_impl(sequence_x, x_begin, x_middle, sequence_y, y_begin, y_begin + k, as_is, lcs)
+    _find_lcs_hirschberg_impl(sequence_x, x_middle, x_end, sequence_y, y_begin + k, y_end, as_is, lcs)
+
+
+def find_lcs_sparse(sequence_x, sequence_y):
+    # Find an LCS by the Hunt-Szymanski algorithm in O((r + m) lg n) time, where r is the number of matching pairs
+    # (i, j) with Xi = Yj. Only matching pairs are visited: thresholds[k] keeps the smallest position j in Y, at which
+    # a common subsequence of length k + 1 of the X prefix seen so far and Y can end
+    positions = {}
+    for j, y_j in enumerate(sequence_y):
+        positions.setdefault(y_j, []).append(j)
+
+    thresholds = []
+    # links[k] is the last matching pair of such a subsequence as (i, previous link)
+    links = []
+    for i, x_i in enumerate(sequence_x):
+        # Visit positions in descending order, so that a pair doesn't extend a pair of the same element of X
+        for j in reversed(positions.get(x_i, ())):
+            k = bisect.bisect_left(thresholds, j)
+            link = (i, links[k - 1] if 0 < k else None)
+            if k == len(thresholds):
+                thresholds.append(j)
+                links.append(link)
+            else:
+                thresholds[k] = j
+                links[k] = link
+
+    lcs = []
+    link = links[-1] if links else None
+    while link is not None:
+        lcs.append(sequence_x[link[0]])
+        link = link[1]
+    lcs.reverse()
+
+    return lcs
+
+
+def estimate_match_density(sequence_x, sequence_y):
+    # Provide the share of the matching pairs (i, j) with Xi = Yj among all the m * n pairs, counted exactly from the
+    # histograms of the sequences in O(m + n)
+    if not sequence_x or not sequence_y:
+        return 0.0
+
+    counts_y = collections.Counter(sequence_y)
+    matches = sum(count * counts_y.get(x_i, 0) for x_i, count in collections.Counter(sequence_x).items())
+    return matches / (len(sequence_x) * len(sequence_y))
+
+
+# A share of matching pairs below which the sparse approach outperforms filling the whole matrix
+SPARSE_DENSITY_THRESHOLD = 0.25
+
+
+def find_lcs_auto(sequence_x, sequence_y):
+    # Find an LCS choosing the approach by the density of matching pairs: the sparse one for rare matches (large
+    # alphabets), the matrix one otherwise. Both give an LCS of the same length, though ties might resolve differently
+    if estimate_match_density(sequence_x, sequence_y) < SPARSE_DENSITY_THRESHOLD:
+        return find_lcs_sparse(sequence_x, sequence_y)
+
+    return find_lcs(sequence_x, sequence_y)
+
+
+class TooManyEdits(ValueError):
+    # Raised by the Myers approach when sequences need more edits than allowed
+    pass
+
+
+def find_lcs_myers(sequence_x, sequence_y, max_edits=None):
+    # Find an LCS by the Myers' O((m + n) * D) algorithm, where D is the number of deletions from X and insertions
+    # into Y needed to turn X into Y, which suits nearly identical sequences. If more than max_edits edits are needed,
+    # TooManyEdits is raised after O((m + n) * max_edits) time
+    return [sequence_x[i] for i, _ in myers_matches(sequence_x, sequence_y, max_edits)]
+
+
+def diff_myers(sequence_x, sequence_y, max_edits=None):
+    # Provide an edit script turning X into Y as a list of pairs (tag, element), where the tag is ' ' for an element of
+    # the LCS, '-' for an element deleted from X and '+' for an element inserted from Y
+    script = []
+    i = j = 0
+    matches = list(myers_matches(sequence_x, sequence_y, max_edits))
+    for match_i, match_j in matches + [(len(sequence_x), len(sequence_y))]:
+        script.extend(('-', sequence_x[k]) for k in range(i, match_i))
+        script.extend(('+', sequence_y[k]) for k in range(j, match_j))
+        if match_i < len(sequence_x):
+            script.append((' ', sequence_x[match_i]))
+        i, j = match_i + 1, match_j + 1
+
+    return script
+
+
+def myers_matches(sequence_x, sequence_y, max_edits=None):
+    # Provide an iterator over ascending pairs (i, j) with Xi = Yj that form an LCS found by the Myers' approach.
+    # The pairs are generated lazily, but TooManyEdits is raised by the call itself
+    split = _split_at_middle_snake(sequence_x, 0, len(sequence_x), sequence_y, 0, len(sequence_y), max_edits)
+    return _iterate_myers_matches(sequence_x, 0, len(sequence_x), sequence_y, 0, len(sequence_y), split)
+
+
+def _split_at_middle_snake(sequence_x, x_begin, x_end, sequence_y, y_begin, y_end, max_edits):
+    # Common prefixes and suffixes are a part of the LCS for sure, so trim them and find the middle snake, the run of
+    # matches an optimal edit path takes half way, of the rest. Provide lengths of the prefix and the suffix and the
+    # snake, if any
+    prefix = 0
+    while x_begin + prefix < x_end and y_begin + prefix < y_end and \
+            sequence_x[x_begin + prefix] == sequence_y[y_begin + prefix]:
+        prefix = prefix + 1
+    suffix = 0
+    while x_begin + prefix < x_end - suffix and y_begin + prefix < y_end - suffix and \
+            sequence_x[x_end - suffix - 1] == sequence_y[y_end - suffix - 1]:
+        suffix = suffix + 1
+
+    snake = None
+    edits = (x_end - x_begin - prefix - suffix) + (y_end - y_begin - prefix - suffix)
+    if x_begin + prefix < x_end - suffix and y_begin + prefix < y_end - suffix:
+        snake = _middle_snake(sequence_x, x_begin + prefix, x_end - suffix,
+                              sequence_y, y_begin + prefix, y_end - suffix, max_edits)
+        edits = snake[0]
+    if max_edits is not None and max_edits < edits:
+        raise TooManyEdits('More than ' + str(max_edits) + ' edits are needed')
+
+    return (prefix, suffix, snake)
+
+
+def _iterate_myers_matches(sequence_x, x_begin, x_end, sequence_y, y_begin, y_end, split):
+    # Generate matches of X[x_begin:x_end] and Y[y_begin:y_end] recursing on both sides of the middle snake.
+    # The recursion is O(lg D) deep and keeps O(D) memory per level
+    prefix, suffix, snake = split
+    yield from zip(range(x_begin, x_begin + prefix), range(y_begin, y_begin + prefix))
+    if snake is not None:
+        _, x_start, y_start, x_stop, y_stop = snake
+        x_begin, y_begin = x_begin + prefix, y_begin + prefix
+        x_last, y_last = x_end - suffix, y_end - suffix
+        yield from _iterate_myers_matches(
+            sequence_x, x_begin, x_start, sequence_y, y_begin, y_start,
+            _split_at_middle_snake(sequence_x, x_begin, x_start, sequence_y, y_begin, y_start, None))
+        yield from zip(range(x_start, x_stop), range(y_start, y_stop))
+        yield from _iterate_myers_matches(
+            sequence_x, x_stop, x_last, sequence_y, y_stop, y_last,
+            _split_at_middle_snake(sequence_x, x_stop, x_last, sequence_y, y_stop, y_last, None))
+    yield from zip(range(x_end - suffix, x_end), range(y_end - suffix, y_end))
+
+
+def _middle_snake(sequence_x, x_begin, x_end, sequence_y, y_begin, y_end, max_edits):
+    # Run the greedy search for the furthest reaching paths forward from the top left corner and backward from the
+    # bottom right corner at the same time, until they overlap on a diagonal k = x - y. Provide the number of edits
+    # and the (x, y) bounds of the snake, where the paths meet
+    n = x_end - x_begin
+    m = y_end - y_begin
+    delta = n - m
+    odd = delta % 2 == 1
+    limit = (n + m + 1) // 2
+    if max_edits is not None:
+        limit = min(limit, (max_edits + 1) // 2)
+
+    # Furthest x reached on each diagonal going forward and the least one going backward, shifted by the offset
+    offset = limit + abs(delta) + 2
+    forward = [0] * (2 * offset + 1)
+    backward = [n + 1] * (2 * offset + 1)
+    forward[offset + 1] = 0
+    backward[offset + delta - 1] = n + 1
+    for d in range(limit + 1):
+        for k in range(-d, d + 1, 2):
+            if k == -d or (k != d and forward[offset + k - 1] < forward[offset + k + 1]):
+                x = forward[offset + k + 1]
+            else:
+                x = forward[offset + k - 1] + 1
+            y = x - k
+            x_start, y_start = x, y
+            while x < n and y < m and sequence_x[x_begin + x] == sequence_y[y_begin + y]:
+                x, y = x + 1, y + 1
+            forward[offset + k] = x
+            if odd and delta - d < k < delta + d and backward[offset + k] <= x:
+                return (2 * d - 1, x_begin + x_start, y_begin + y_start, x_begin + x, y_begin + y)
+
+        for k in range(-d, d + 1, 2):
+            k_back = k + delta
+            if k == -d or (k != d and backward[offset + k_back + 1] - 1 < backward[offset + k_back - 1]):
+                x = backward[offset + k_back + 1] - 1
+            else:
+                x = backward[offset + k_back - 1]
+            y = x - k_back
+            x_stop, y_stop = x, y
+            while 0 < x and 0 < y and sequence_x[x_begin + x - 1] == sequence_y[y_begin + y - 1]:
+                x, y = x - 1, y - 1
+            backward[offset + k_back] = x
+            if not odd and -d <= k_back <= d and x <= forward[offset + k_back]:
+                return (2 * d, x_begin + x, y_begin + y, x_begin + x_stop, y_begin + y_stop)
+
+    raise TooManyEdits('More than ' + str(max_edits) + ' edits are needed')
+
+
+def find_lcs_multiple(sequences, max_states=None):
+    # Find an LCS of k sequences by enumerating dominant points level by level (Hakata-Imai). A point is a k-tuple of
+    # positions holding the same element in every sequence, a point of the level L ends a common subsequence of
+    # length L. Successors of a point are the nearest next occurrences of each common element in every sequence, and
+    # only the dominant successors are kept: no other one is at or before them in all the sequences.
+    # If max_states is given, only that many points with the least sum of positions are kept per level, which bounds
+    # the memory, but might miss the longest subsequence. Provide the LCS and the number of visited states
+    k = len(sequences)
+    if k == 0:
+        return ([], 0)
+
+    # Positions of the elements common to all the sequences
+    common = set(sequences[0])
+    for sequence in sequences[1:]:
+        common.intersection_update(sequence)
+    positions = []
+    for sequence in sequences:
+        occurrences = {element: [] for element in common}
+        for position, element in enumerate(sequence):
+            if element in occurrences:
+                occurrences[element].append(position)
+        positions.append(occurrences)
+    # Stick to the order of the first sequence to keep runs reproducible
+    common = sorted(common, key=positions[0].__getitem__)
+
+    visited = 0
+    # Each level maps its points to their predecessors on the previous level
+    levels = []
+    level = {(-1,) * k: None}
+    while True:
+        successors = {}
+        for point in level:
+            for element in common:
+                successor = []
+                for occurrences, position in zip(positions, point):
+                    occurrences = occurrences[element]
+                    following = bisect.bisect_right(occurrences, position)
+                    if following == len(occurrences):
+                        break
+                    successor.append(occurrences[following])
+                else:
+                    visited = visited + 1
+                    successors.setdefault(tuple(successor), point)
+        if not successors:
+            break
+
+        dominant = _dominant_points(successors)
+        if max_states is not None and max_states < len(dominant):
+            dominant = sorted(dominant, key=sum)[:max_states]
+        level = {point: successors[point] for point in dominant}
+        levels.append(level)
+
+    lcs = []
+    point = next(iter(levels[-1])) if levels else None
+    for level in reversed(levels):
+        lcs.append(sequences[0][point[0]])
+        point = level[point]
+    lcs.reverse()
+
+    return (lcs, visited)
+
+
+def _dominant_points(points):
+    # Keep the points, which no other point precedes in all the coordinates. For every point, a bit mask of the points
+    # at or before it is built per coordinate, the intersection of the masks is the point itself for a dominant one
+    points = sorted(points)
+    at_or_before = [(1 << len(points)) - 1] * len(points)
+    for coordinate in range(len(points[0]) if points else 0):
+        order = sorted(range(len(points)), key=lambda i: points[i][coordinate])
+        mask = 0
+        begin = 0
+        while begin < len(order):
+            # Points sharing the coordinate precede each other
+            end = begin
+            while end < len(order) and points[order[end]][coordinate] == points[order[begin]][coordinate]:
+                mask = mask | (1 << order[end])
+                end = end + 1
+            for i in order[begin:end]:
+                at_or_before[i] = at_or_before[i] & mask
+            begin = end
+
+    return [point for i, point in enumerate(points) if at_or_before[i] == 1 << i]
+
+
+def lcs_length(sequence_x, sequence_y):
+    # Find the length of an LCS bit-parallel (Allison-Dix, Hyyro): a whole row of the matrix is encoded as a bit vector
+    # V over the elements of X, where a zero bit marks the positions at which the row value steps up. Matching a
+    # single element of Y updates the entire row by a few operations on Python big integers
+    return lcs_length_by_masks(lcs_match_masks(sequence_x), len(sequence_x), sequence_y)
+
+
+def lcs_match_masks(sequence_x):
+    # Precompute, per element value, a mask of the positions of X it occupies. The masks serve any number of Y
+    matches = {}
+    for i, x_i in enumerate(sequence_x):
+        matches[x_i] = matches.get(x_i, 0) | (1 << i)
+
+    return matches
+
+
+def lcs_length_by_masks(matches, m, sequence_y):
+    # The same as lcs_length for the masks of X of length m
+    if m == 0 or not sequence_y:
+        return 0
+
+    full = (1 << m) - 1
+    row = full
+    for y_j in sequence_y:
+        match = matches.get(y_j)
+        if match is None:
+            continue
+        u = row & match
+        row = ((row + u) | (row - u)) & full
+
+    return m - bin(row).count('1')
+
+
+def benchmark(lengths=(500, 1000, 2000, 4000), alphabet='ACGT', seed=8):
+    # Compare lcs_length against find_lcs on random DNA-like sequences
+    random.seed(seed)
+    for length in lengths:
+        x = random.choices(alphabet, k=length)
+        y = random.choices(alphabet, k=length)
+
+        start = time.perf_counter()
+        expected = len(find_lcs(x, y))
+        find_lcs_elapsed = time.perf_counter() - start
+
+        start = time.perf_counter()
+        actual = lcs_length(x, y)
+        lcs_length_elapsed = time.perf_counter() - start
+
+        assert actual == expected
+        print('m = n =', length, 'find_lcs =', format(find_lcs_elapsed, '.4f') + 's',
+              'lcs_length =', format(lcs_length_elapsed, '.4f') + 's',
+              'speedup =', format(find_lcs_elapsed / lcs_length_elapsed, '.0f') + 'x')
+
+
 class Tests(unittest.TestCase):
     def test_motivational_dna(self):
         x = list('ACCGGTCGAGTGCGCGGAAGCCGGCCGAA')
@@ -113,7 +566,9 @@ class Tests(unittest.TestCase):
 
         lcs = find_lcs(x, y)
         lcs_recursively = find_lcs_recursively(x, y)
-        self.assertTrue(lcs == lcs_recursively == expected_lcs)
+        lcs_hirschberg = find_lcs_hirschberg(x, y)
+        self.assertTrue(lcs == lcs_recursively == lcs_hirschberg == expected_lcs)
+        self.assertEqual(find_lcs_length(x, y), len(expected_lcs))
 
     def test_motivational_lcs_example(self):
         x = list('ABCBDAB')
@@ -122,7 +577,9 @@ class Tests(unittest.TestCase):
 
         lcs = find_lcs(x, y)
         lcs_recursively = find_lcs_recursively(x, y)
-        self.assertTrue(lcs == lcs_recursively == expected_lcs)
+        lcs_hirschberg = find_lcs_hirschberg(x, y)
+        self.assertTrue(lcs == lcs_recursively == lcs_hirschberg == expected_lcs)
+        self.assertEqual(find_lcs_length(x, y), len(expected_lcs))
 
     def test_indexing(self):
         x = list('ABC')
@@ -131,7 +588,9 @@ class Tests(unittest.TestCase):
 
         lcs = find_lcs(x, y)
         lcs_recursively = find_lcs_recursively(x, y)
-        self.assertTrue(lcs == lcs_recursively == expected_lcs)
+        lcs_hirschberg = find_lcs_hirschberg(x, y)
+        self.assertTrue(lcs == lcs_recursively == lcs_hirschberg == expected_lcs)
+        self.assertEqual(find_lcs_length(x, y), len(expected_lcs))
 
     def test_15_4_1(self):
         x = list('10010101')
@@ -140,8 +599,135 @@ class Tests(unittest.TestCase):
 
         lcs = find_lcs(x, y)
         lcs_recursively = find_lcs_recursively(x, y)
-        self.assertTrue(lcs == lcs_recursively == expected_lcs)
+        lcs_hirschberg = find_lcs_hirschberg(x, y)
+        self.assertTrue(lcs == lcs_recursively == lcs_hirschberg == expected_lcs)
+        self.assertEqual(find_lcs_length(x, y), len(expected_lcs))
+
+    def test_hirschberg_matches_find_lcs(self):
+        random.seed(7)
+        for alphabet in ('AB', 'ACGT', 'ABCDEFGH'):
+            for _ in range(300):
+                x = random.choices(alphabet, k=random.randint(0, 25))
+                y = random.choices(alphabet, k=random.randint(0, 25))
+                with self.subTest(x=x, y=y):
+                    lcs = find_lcs(x, y)
+                    self.assertEqual(find_lcs_hirschberg(x, y), lcs)
+                    self.assertEqual(find_lcs_length(x, y), len(lcs))
+
+    @unittest.skipIf(np is None, 'NumPy is not available')
+    def test_numpy(self):
+        random.seed(13)
+        for alphabet in ('AB', 'ACGT', 'ABCDEFGH'):
+            for _ in range(200):
+                x = random.choices(alphabet, k=random.randint(0, 25))
+                y = random.choices(alphabet, k=random.randint(0, 25))
+                with self.subTest(x=x, y=y):
+                    self.assertEqual(find_lcs_numpy(x, y), find_lcs(x, y))
+        self.assertEqual(find_lcs_numpy(list('ABCBDAB'), list('BDCABA')), list('BCBA'))
+
+    def test_lcs_length(self):
+        random.seed(8)
+        for alphabet in ('AB', 'ACGT', 'ABCDEFGH'):
+            for _ in range(300):
+                x = random.choices(alphabet, k=random.randint(0, 70))
+                y = random.choices(alphabet, k=random.randint(0, 70))
+                with self.subTest(x=x, y=y):
+                    self.assertEqual(lcs_length(x, y), len(find_lcs(x, y)))
+        self.assertEqual(lcs_length(list('ABCBDAB'), list('BDCABA')), 4)
+
+    def assertCommonSubsequence(self, lcs, x, y):
+        for sequence in (x, y):
+            remaining = iter(sequence)
+            self.assertTrue(all(element in remaining for element in lcs))
+
+    def test_sparse(self):
+        random.seed(9)
+        for alphabet_size in (2, 4, 50, 1000):
+            for _ in range(200):
+                x = [random.randrange(alphabet_size) for _ in range(random.randint(0, 40))]
+                y = [random.randrange(alphabet_size) for _ in range(random.randint(0, 40))]
+                with self.subTest(x=x, y=y):
+                    expected_length = len(find_lcs(x, y))
+                    for lcs in (find_lcs_sparse(x, y), find_lcs_auto(x, y)):
+                        self.assertEqual(len(lcs), expected_length)
+                        self.assertCommonSubsequence(lcs, x, y)
+
+    def test_myers(self):
+        random.seed(10)
+        for alphabet in ('AB', 'ACGT', 'ABCDEFGH'):
+            for _ in range(300):
+                x = random.choices(alphabet, k=random.randint(0, 30))
+                y = random.choices(alphabet, k=random.randint(0, 30))
+                with self.subTest(x=x, y=y):
+                    lcs = find_lcs_myers(x, y)
+                    self.assertEqual(len(lcs), len(find_lcs(x, y)))
+                    self.assertCommonSubsequence(lcs, x, y)
+
+                    script = diff_myers(x, y)
+                    self.assertEqual([e for tag, e in script if tag != '+'], x)
+                    self.assertEqual([e for tag, e in script if tag != '-'], y)
+                    self.assertEqual([e for tag, e in script if tag == ' '], lcs)
+
+    def test_myers_max_edits(self):
+        x = list('ABCABBA')
+        y = list('CBABAC')
+        self.assertEqual(len(find_lcs_myers(x, y, max_edits=5)), 4)
+        self.assertRaises(TooManyEdits, find_lcs_myers, x, y, max_edits=4)
+        self.assertRaises(TooManyEdits, find_lcs_myers, list('AAAA'), [], max_edits=3)
+        self.assertEqual(find_lcs_myers(x, x, max_edits=0), x)
+
+        random.seed(11)
+        for _ in range(300):
+            x = random.choices('ABC', k=random.randint(0, 15))
+            y = random.choices('ABC', k=random.randint(0, 15))
+            edits = len(x) + len(y) - 2 * len(find_lcs(x, y))
+            with self.subTest(x=x, y=y):
+                self.assertEqual(len(find_lcs_myers(x, y, max_edits=edits)), len(find_lcs(x, y)))
+                if 0 < edits:
+                    self.assertRaises(TooManyEdits, find_lcs_myers, x, y, max_edits=edits - 1)
+
+    def test_multiple(self):
+        def find_lcs_length_3(x, y, z):
+            # A straightforward 3D table for reference
+            table = [[[0] * (len(z) + 1) for _ in range(len(y) + 1)] for _ in range(len(x) + 1)]
+            for i in range(1, len(x) + 1):
+                for j in range(1, len(y) + 1):
+                    for k in range(1, len(z) + 1):
+                        if x[i - 1] == y[j - 1] == z[k - 1]:
+                            table[i][j][k] = table[i - 1][j - 1][k - 1] + 1
+                        else:
+                            table[i][j][k] = max(table[i - 1][j][k], table[i][j - 1][k], table[i][j][k - 1])
+            return table[-1][-1][-1]
+
+        random.seed(14)
+        for alphabet in ('AB', 'ACGT', 'ABCDEFGH'):
+            for _ in range(50):
+                x, y, z = (random.choices(alphabet, k=random.randint(0, 12)) for _ in range(3))
+                with self.subTest(x=x, y=y, z=z):
+                    lcs, visited = find_lcs_multiple([x, y])
+                    self.assertEqual(len(lcs), len(find_lcs(x, y)))
+                    lcs, visited = find_lcs_multiple([x, y, z])
+                    self.assertEqual(len(lcs), find_lcs_length_3(x, y, z))
+                    for sequence in (x, y, z):
+                        self.assertCommonSubsequence(lcs, sequence, sequence)
+
+                    bounded, bounded_visited = find_lcs_multiple([x, y, z], max_states=1)
+                    self.assertLessEqual(len(bounded), len(lcs))
+                    self.assertLessEqual(bounded_visited, visited)
+                    self.assertCommonSubsequence(bounded, x, y)
+                    self.assertCommonSubsequence(bounded, x, z)
+
+        self.assertEqual(find_lcs_multiple([list('ABCBDAB'), list('BDCABA'), list('BADACB')])[0], list('BDAB'))
+        self.assertEqual(find_lcs_multiple([list('ABC')])[0], list('ABC'))
+        self.assertEqual(find_lcs_multiple([]), ([], 0))
+
+    def test_match_density(self):
+        self.assertEqual(estimate_match_density(list('AB'), list('AAC')), 2 / 6)
+        self.assertEqual(estimate_match_density([], list('A')), 0.0)
 
 
 if __name__ == '__main__':
-    unittest.main()
+    if '--benchmark' in sys.argv:
+        benchmark()
+    else:
+        unittest.main()
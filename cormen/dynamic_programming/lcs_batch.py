@@ -0,0 +1,155 @@
+"""
+The longest-common-subsequence problem for a single query sequence against many candidate sequences.
+
+The query is preprocessed once in the parent process (match masks of the bit-parallel approach from lcs.py) and handed
+to every worker of a process pool once, when the worker starts. Candidates are sent to the workers in chunks, and
+results come back in the order the chunks complete.
+"""
+
+import heapq
+import itertools
+import multiprocessing
+import os
+import random
+import sys
+import time
+import unittest
+
+# Modules shared by the chapters are found in the parent directory
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import lcs
+import process_pool
+
+# State of a worker process: the query, its match masks and whether full LCSes are wanted
+_worker_query = None
+_worker_masks = None
+_worker_full = False
+
+
+def _init_worker(query, masks, full):
+    global _worker_query, _worker_masks, _worker_full
+    _worker_query = query
+    _worker_masks = masks
+    _worker_full = full
+
+
+def _score_chunk(chunk):
+    # Provide (index, result) for a chunk of (index, candidate) pairs
+    if _worker_full:
+        return [(index, lcs.find_lcs_hirschberg(_worker_query, candidate)) for index, candidate in chunk]
+
+    m = len(_worker_query)
+    return [(index, lcs.lcs_length_by_masks(_worker_masks, m, candidate)) for index, candidate in chunk]
+
+
+def _chunks(candidates, chunk_size):
+    enumerated = enumerate(candidates)
+    while True:
+        chunk = list(itertools.islice(enumerated, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def iterate_batch_lcs(query, candidates, full=False, processes=None, chunk_size=256):
+    # Generate (index, result) for every candidate in the order of completion, where the index is a position of the
+    # candidate among the candidates and the result is either the length of an LCS of the query and the candidate, or
+    # the LCS itself if full. The candidates are consumed lazily: at most two chunks per process are in flight.
+    # A single process scores them in place
+    assert 0 < chunk_size, "Chunk size is assumed to be positive"
+    query = list(query)
+    masks = lcs.lcs_match_masks(query)
+    if processes == 1:
+        _init_worker(query, masks, full)
+        for chunk in _chunks(candidates, chunk_size):
+            yield from _score_chunk(chunk)
+        return
+
+    with multiprocessing.Pool(processes, initializer=_init_worker, initargs=(query, masks, full)) as pool:
+        for results in process_pool.imap_bounded(pool, _score_chunk, _chunks(candidates, chunk_size), processes):
+            yield from results
+
+
+def top_k_batch_lcs(query, candidates, k, full=False, processes=None, chunk_size=256):
+    # Provide (index, result) for the k candidates having the longest LCSes with the query, from the longest one.
+    # Only k results are kept in memory at a time
+    assert 0 <= k, "The number of results is assumed to be non-negative"
+    score = len if full else int
+    top = []
+    for index, result in iterate_batch_lcs(query, candidates, full, processes, chunk_size):
+        # Prefer earlier candidates among equally good ones
+        entry = (score(result), -index, result)
+        if len(top) < k:
+            heapq.heappush(top, entry)
+        elif top and top[0][:2] < entry[:2]:
+            heapq.heapreplace(top, entry)
+
+    return [(-negated_index, result) for _, negated_index, result in sorted(top, key=lambda e: e[:2], reverse=True)]
+
+
+def benchmark(candidates=20000, length=200, alphabet='ACGT', seed=12):
+    # Compare serial lcs.lcs_length calls with the batch approach over growing numbers of processes
+    random.seed(seed)
+    query = random.choices(alphabet, k=length)
+    pool = [random.choices(alphabet, k=length) for _ in range(candidates)]
+
+    start = time.perf_counter()
+    expected = [lcs.lcs_length(query, candidate) for candidate in pool]
+    print('serial lcs_length =', format(time.perf_counter() - start, '.3f') + 's')
+
+    for processes in sorted({1, 2, 4, multiprocessing.cpu_count()}):
+        start = time.perf_counter()
+        actual = dict(iterate_batch_lcs(query, pool, processes=processes))
+        assert [actual[i] for i in range(candidates)] == expected
+        print('processes =', processes, 'batch =', format(time.perf_counter() - start, '.3f') + 's')
+
+
+class Tests(unittest.TestCase):
+    def setUp(self):
+        random.seed(12)
+        self.query = random.choices('ACGT', k=40)
+        self.candidates = [random.choices('ACGT', k=random.randint(0, 50)) for _ in range(300)]
+        self.lengths = [len(lcs.find_lcs(self.query, candidate)) for candidate in self.candidates]
+
+    def test_lengths(self):
+        for processes in (1, 2):
+            with self.subTest(processes=processes):
+                results = list(iterate_batch_lcs(self.query, iter(self.candidates), processes=processes,
+                                                 chunk_size=7))
+                self.assertEqual(sorted(index for index, _ in results), list(range(len(self.candidates))))
+                self.assertEqual([dict(results)[i] for i in range(len(self.candidates))], self.lengths)
+
+    def test_lazy(self):
+        # Candidates are drawn only as fast as results are consumed
+        drawn = []
+
+        def candidates():
+            for candidate in self.candidates * 100:
+                drawn.append(candidate)
+                yield candidate
+
+        results = iterate_batch_lcs(self.query, candidates(), processes=2, chunk_size=10)
+        next(results)
+        self.assertLessEqual(len(drawn), (2 * 2 + 1) * 10)
+        results.close()
+
+    def test_full(self):
+        results = dict(iterate_batch_lcs(self.query, self.candidates, full=True, processes=2, chunk_size=50))
+        for index, candidate in enumerate(self.candidates):
+            self.assertEqual(results[index], lcs.find_lcs(self.query, candidate))
+
+    def test_top_k(self):
+        expected = sorted(range(len(self.candidates)), key=lambda i: (-self.lengths[i], i))[:5]
+        for full in (False, True):
+            with self.subTest(full=full):
+                top = top_k_batch_lcs(self.query, self.candidates, 5, full=full, processes=2)
+                self.assertEqual([index for index, _ in top], expected)
+        self.assertEqual(top_k_batch_lcs(self.query, self.candidates, 0, processes=1), [])
+
+
+if __name__ == '__main__':
+    if '--benchmark' in sys.argv:
+        benchmark()
+    else:
+        unittest.main()
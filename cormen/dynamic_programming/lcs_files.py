@@ -0,0 +1,222 @@
+"""
+The longest-common-subsequence problem for files too large to be loaded as Python lists of lines or characters.
+
+Both files are memory-mapped. Their common prefix and suffix are trimmed by comparing memoryview blocks of the mapped
+files without copying. Lines (or fixed-size chunks) of the rest are hashed into compact arrays of integers, an LCS of
+these arrays is found by the linear-space Myers' approach from lcs.py, and hunks of the diff are generated one by one.
+"""
+
+import array
+import collections
+import contextlib
+import hashlib
+import mmap
+import os
+import tempfile
+import unittest
+
+import lcs
+
+# Lines (or chunks) X[x_begin:x_end] of the first file are replaced with lines Y[y_begin:y_end] of the second one
+Hunk = collections.namedtuple('Hunk', ['x_begin', 'x_end', 'y_begin', 'y_end', 'deleted', 'inserted'])
+
+# Size of blocks to compare while looking for the common prefix and suffix
+_BLOCK_SIZE = 1 << 16
+
+# Size of blocks to count lines of the common prefix in
+_COUNT_BLOCK_SIZE = 1 << 20
+
+
+def diff_files(path_x, path_y, chunk_size=None, max_edits=None):
+    # Generate hunks turning the file X into the file Y, which are compared line by line, or chunk_size bytes by
+    # chunk_size bytes if given. Numbering of lines (chunks) starts at zero. If more than max_edits lines (chunks) have
+    # to be deleted or inserted, lcs.TooManyEdits is raised before the first hunk
+    assert chunk_size is None or 0 < chunk_size, "Chunk size is assumed to be positive"
+
+    with open(path_x, 'rb') as file_x, open(path_y, 'rb') as file_y:
+        with _map(file_x) as data_x, _map(file_y) as data_y:
+            with memoryview(data_x) as view_x, memoryview(data_y) as view_y:
+                yield from _diff_views(view_x, view_y, chunk_size, max_edits)
+
+
+def _map(file):
+    # Map a file read-only, an empty file can't be mapped, so it's substituted by empty bytes
+    if os.fstat(file.fileno()).st_size == 0:
+        return contextlib.nullcontext(b'')
+
+    return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def _diff_views(view_x, view_y, chunk_size, max_edits):
+    prefix = _common_prefix(view_x, view_y)
+    if prefix == len(view_x) == len(view_y):
+        return
+
+    suffix = _common_suffix(view_x, view_y, min(len(view_x), len(view_y)) - prefix)
+    if chunk_size is None:
+        # Keep whole lines only in the prefix and the suffix
+        prefix = view_x.obj.rfind(b'\n', 0, prefix) + 1
+        suffix = _align_suffix(view_x, view_y, suffix)
+        first_unit = _count_newlines(view_x, prefix)
+    else:
+        # Keep whole chunks only, chunks are counted from the beginning of the files, so the suffix is of use only
+        # if both files end with chunks of the same size
+        prefix = prefix - prefix % chunk_size
+        first_unit = prefix // chunk_size
+        if (len(view_x) - len(view_y)) % chunk_size == 0:
+            suffix = max(0, suffix - (suffix - len(view_x)) % chunk_size)
+        else:
+            suffix = 0
+
+    starts_x, hashes_x = _hash_units(view_x, prefix, len(view_x) - suffix, chunk_size)
+    starts_y, hashes_y = _hash_units(view_y, prefix, len(view_y) - suffix, chunk_size)
+
+    i = j = 0
+    matches = lcs.myers_matches(hashes_x, hashes_y, max_edits)
+    for match_i, match_j in _chain(matches, (len(hashes_x), len(hashes_y))):
+        if i < match_i or j < match_j:
+            yield Hunk(first_unit + i, first_unit + match_i, first_unit + j, first_unit + match_j,
+                       [bytes(view_x[starts_x[k]:starts_x[k + 1]]) for k in range(i, match_i)],
+                       [bytes(view_y[starts_y[k]:starts_y[k + 1]]) for k in range(j, match_j)])
+        i, j = match_i + 1, match_j + 1
+
+
+def _chain(matches, last):
+    yield from matches
+    yield last
+
+
+def _common_prefix(view_x, view_y):
+    # Compare blocks and narrow down the first mismatching one by halving it
+    length = min(len(view_x), len(view_y))
+    prefix = 0
+    while prefix < length:
+        step = min(_BLOCK_SIZE, length - prefix)
+        if view_x[prefix:prefix + step] == view_y[prefix:prefix + step]:
+            prefix = prefix + step
+            continue
+
+        while 1 < step:
+            half = step // 2
+            if view_x[prefix:prefix + half] == view_y[prefix:prefix + half]:
+                prefix, step = prefix + half, step - half
+            else:
+                step = half
+        break
+
+    return prefix
+
+
+def _common_suffix(view_x, view_y, limit):
+    # The same as above, but from the ends of the views and no longer than the limit
+    end_x, end_y = len(view_x), len(view_y)
+    suffix = 0
+    while suffix < limit:
+        step = min(_BLOCK_SIZE, limit - suffix)
+        if view_x[end_x - suffix - step:end_x - suffix] == view_y[end_y - suffix - step:end_y - suffix]:
+            suffix = suffix + step
+            continue
+
+        while 1 < step:
+            half = step // 2
+            if view_x[end_x - suffix - half:end_x - suffix] == view_y[end_y - suffix - half:end_y - suffix]:
+                suffix, step = suffix + half, step - half
+            else:
+                step = half
+        break
+
+    return suffix
+
+
+def _align_suffix(view_x, view_y, suffix):
+    # Shorten the common suffix so that it starts a line in both views. Within the suffix both views are the same, so
+    # the suffix either starts right after a newline in both of them, or is cut after its first newline
+    start_x, start_y = len(view_x) - suffix, len(view_y) - suffix
+    if (start_x == 0 or view_x[start_x - 1] == ord('\n')) and (start_y == 0 or view_y[start_y - 1] == ord('\n')):
+        return suffix
+
+    newline = view_x.obj.find(b'\n', start_x)
+    return 0 if newline < 0 else len(view_x) - newline - 1
+
+
+def _count_newlines(view, end):
+    return sum(bytes(view[block:min(block + _COUNT_BLOCK_SIZE, end)]).count(b'\n')
+               for block in range(0, end, _COUNT_BLOCK_SIZE))
+
+
+def _hash_units(view, begin, end, chunk_size):
+    # Split the view[begin:end] into lines (or chunks) and provide an array of their starts, followed by the end, and
+    # an array of their 64-bit hashes
+    starts = array.array('Q')
+    hashes = array.array('Q')
+    position = begin
+    while position < end:
+        if chunk_size is None:
+            newline = view.obj.find(b'\n', position, end)
+            following = end if newline < 0 else newline + 1
+        else:
+            following = min(position + chunk_size, end)
+        starts.append(position)
+        hashes.append(int.from_bytes(hashlib.blake2b(view[position:following], digest_size=8).digest(), 'little'))
+        position = following
+    starts.append(end)
+
+    return (starts, hashes)
+
+
+class Tests(unittest.TestCase):
+    def diff(self, x, y, **kwargs):
+        with tempfile.TemporaryDirectory() as directory:
+            paths = [os.path.join(directory, name) for name in ('x', 'y')]
+            for path, content in zip(paths, (x, y)):
+                with open(path, 'wb') as file:
+                    file.write(content)
+            return list(diff_files(*paths, **kwargs))
+
+    def apply(self, x, hunks, chunk_size=None):
+        # Turn X into Y by means of the hunks
+        if chunk_size is None:
+            units = x.splitlines(keepends=True)
+        else:
+            units = [x[k:k + chunk_size] for k in range(0, len(x), chunk_size)]
+        for hunk in reversed(hunks):
+            self.assertEqual(units[hunk.x_begin:hunk.x_end], hunk.deleted)
+            units[hunk.x_begin:hunk.x_end] = hunk.inserted
+        return b''.join(units)
+
+    def test_identical(self):
+        self.assertEqual(self.diff(b'a\nb\n', b'a\nb\n'), [])
+        self.assertEqual(self.diff(b'', b''), [])
+
+    def test_lines(self):
+        x = b'one\ntwo\nthree\nfour\nfive\n'
+        y = b'one\n2\nthree\nfour\nfive\nsix'
+        hunks = self.diff(x, y)
+        self.assertEqual(hunks, [Hunk(1, 2, 1, 2, [b'two\n'], [b'2\n']), Hunk(5, 5, 5, 6, [], [b'six'])])
+        self.assertEqual(self.apply(x, hunks), y)
+
+    def test_partial_lines(self):
+        for x, y in ((b'abc\nabd', b'abc\nabe'), (b'ab', b'abc'), (b'', b'x\ny\n'), (b'x\ny', b''),
+                     (b'a\nb\n', b'a\nb\nc\nb\n'), (b'xa\nb\n', b'ya\nb\n'), (b'a\nb', b'b')):
+            with self.subTest(x=x, y=y):
+                self.assertEqual(self.apply(x, self.diff(x, y)), y)
+
+    def test_random(self):
+        import random
+        random.seed(11)
+        for _ in range(100):
+            x = b''.join(random.choice((b'a\n', b'b\n', b'c', b'\n', b'aa\n')) for _ in range(random.randint(0, 30)))
+            y = b''.join(random.choice((b'a\n', b'b\n', b'c', b'\n', b'aa\n')) for _ in range(random.randint(0, 30)))
+            for chunk_size in (None, 1, 3):
+                with self.subTest(x=x, y=y, chunk_size=chunk_size):
+                    self.assertEqual(self.apply(x, self.diff(x, y, chunk_size=chunk_size), chunk_size), y)
+
+    def test_max_edits(self):
+        x = b'a\nb\nc\n'
+        y = b'a\nB\nc\n'
+        self.assertEqual(len(self.diff(x, y, max_edits=2)), 1)
+        self.assertRaises(lcs.TooManyEdits, self.diff, x, y, max_edits=1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,7 +1,17 @@
-from operator import mul
 from functools import reduce
+import collections
+import concurrent.futures
+import json
+import sys
+import threading
+import time
 import unittest
 
+try:
+  import numpy as np
+except ImportError:
+  np = None
+
 """
 Given a chain <A0, A1, ..., An> of n matrices, where for i = 0, 1, ..., n,
 matrix Ai has dimension pi-1 x pi, fully paranthesize the product A0xA1x..xAn
@@ -12,11 +22,12 @@ def matrix_chain_mult(p):
     # Locate element of symmetrical matrix, which is stored in compact form
     # without diagonal elements
     assert(i < j)
-    return int(i * (2 * n - i - 3) / 2 + j - 1)
+    # i * (2 * n - i - 3) is even, so integer division is exact for any n
+    return i * (2 * n - i - 3) // 2 + j - 1
 
   n = len(p) - 1
   # The minimal number of scalar multiplications needed to compute matrix Ai..j
-  m = [reduce(mul, p)] * int(n * (n-1) / 2)
+  m = [0] * (n * (n-1) // 2)
   # Which index of k achieved the optimal cost in computing m[i, j]
   s = [0] * len(m)
   
@@ -33,29 +44,309 @@ def matrix_chain_mult(p):
         m_ik = m[ind(i, n, k)] if i != k else 0
         m_ik1j = m[ind(k+1, n, j)] if k+1 != j else 0        
         m_ij = m_ik + m_ik1j + p[i] * p[k+1] * p[j+1]
-        if m_ij < m[ij]:
+        if k == i or m_ij < m[ij]:
           m[ij] = m_ij
           s[ij] = k 
 
-  # Queue of sub-problems to analyze and extract optimal positions k
-  # in linear fashion
-  queue = [(0, n-1)]
-  # Sequence of optimal multiplications
+  # Walk the tree of sub-problems to extract optimal positions k in linear
+  # fashion
+  optimal = _unwind_splits(n, lambda i, j: s[ind(i, n, j)])
+
+  return (m[ind(0, n, n-1)], optimal)
+
+def matrix_chain_mult_numpy(p):
+  # The same as matrix_chain_mult, but m and s are 2D NumPy arrays, m[i, j] and
+  # s[i, j] belong to Ai..j, and all the candidates k = i + t of a diagonal
+  # j = i + d are evaluated at once as a (n - d) x d array
+  assert np is not None, "NumPy is required for the vectorized approach"
+  n = len(p) - 1
+  assert 2 <= n, "At least two matrices are expected"
+
+  # Fall back to Python integers, if costs might overflow 64 bits
+  dtype = np.int64 if n * max(p) ** 3 < np.iinfo(np.int64).max else object
+  dims = np.array(p, dtype=dtype)
+  m = np.zeros((n, n), dtype=dtype)
+  s = np.zeros((n, n), dtype=np.intp)
+  for d in range(1, n):
+    i = np.arange(n - d)[:, None]
+    k = i + np.arange(d)[None, :]
+    j = i + d
+    candidates = m[i, k] + m[k + 1, j] + dims[i] * dims[k + 1] * dims[j + 1]
+    # argmin picks the first minimum, just as the loop over k does
+    best = np.argmin(candidates, axis=1)
+    rows = np.arange(n - d)
+    m[rows, rows + d] = candidates[rows, best]
+    s[rows, rows + d] = rows + best
+
+  optimal = _unwind_splits(n, lambda i, j: int(s[i, j]))
+  return (int(m[0, n-1]), optimal)
+
+"""
+A product of the chain corresponds to a triangulation of the convex polygon
+with vertices V0, V1, ..., Vn+1 weighted by p0, p1, ..., pn+1: the matrix Ai is
+the side Vi Vi+1, the whole product is the side V0 Vn+1 and a triangle costs
+the product of its weights. Chin's O(n) heuristic cuts the polygon around its
+lightest vertex V: going along the sides, a vertex Vt is cut off by the arc
+Vt-1 Vt+1 whenever 1/V + 1/Vt < 1/Vt-1 + 1/Vt+1, i.e. the cut off beats fanning
+the quadrilateral V Vt-1 Vt Vt+1 from V. The rest is fanned from V. The cost is
+known to be at most 25% above the optimum (Hu and Shing tightened it to 15.5%)
+"""
+def matrix_chain_mult_approx(p):
+  n = len(p) - 1
+  if n < 2:
+    return (0, [])
+
+  # Walk along the polygon from its lightest vertex keeping a stack of vertices
+  # not cut off yet, triangles are kept as the arc (a, c) -> the vertex b, such
+  # that a < b < c
+  lightest = min(range(n + 1), key=lambda v: p[v])
+  w = p[lightest]
+  inner = {}
+  def add_triangle(a, b, c):
+    a, b, c = sorted((a, b, c))
+    inner[(a, c)] = b
+
+  stack = [lightest]
+  for step in range(1, n + 2):
+    v = (lightest + step) % (n + 1)
+    while 2 <= len(stack) and stack[-2] != lightest:
+      t = stack[-1]
+      u = stack[-2]
+      # 1/w + 1/p[t] < 1/p[u] + 1/p[v] with denominators cleared
+      if p[u] * p[v] * (p[t] + w) < w * p[t] * (p[u] + p[v]):
+        add_triangle(u, t, v)
+        stack.pop()
+      else:
+        break
+    stack.append(v)
+  for a, b in zip(stack[1:-1], stack[2:-1]):
+    add_triangle(lightest, a, b)
+
+  cost = sum(p[a] * p[b] * p[c] for (a, c), b in inner.items())
+
+  # The split of Ai..j is given by the triangle inside the arc Vi Vj+1
+  optimal = _unwind_splits(n, lambda i, j: inner[(i, j + 1)] - 1)
+  return (cost, optimal)
+
+def _unwind_splits(n, split):
+  # List splits of the sub-problems in the same order matrix_chain_mult does:
+  # reversed pre-order of the parenthesization tree, so every product is
+  # listed after the products it consists of
   optimal = []
-  while queue:
-    top = queue.pop(0)
+  stack = [(0, n-1)]
+  while stack:
+    i, j = stack.pop()
+    k = split(i, j)
+    optimal.append(k)
+    if k+1 != j:
+      stack.append((k+1, j))
+    if i != k:
+      stack.append((i, k))
+  optimal.reverse()
+
+  return optimal
+
+"""
+Plans of repeated chains. The costs and splits are kept column by column: the
+column j holds sub-problems Ai..j for i = j, j-1, ..., 0, which don't depend on
+matrices past Aj. So a chain extending a cached one reuses its columns and
+computes the new ones only
+"""
+def extend_chain_tables(p, costs, splits):
+  # Extend the columns of costs and splits of the sub-problems up to the whole
+  # chain, costs[j][i] and splits[j][i] belong to Ai..j
+  n = len(p) - 1
+  for j in range(len(costs), n):
+    cost_column = [0] * (j + 1)
+    split_column = [j] * (j + 1)
+    for i in range(j - 1, -1, -1):
+      for k in range(i, j):
+        m_ij = costs[k][i] + cost_column[k+1] + p[i] * p[k+1] * p[j+1]
+        if k == i or m_ij < cost_column[i]:
+          cost_column[i] = m_ij
+          split_column[i] = k
+    costs.append(cost_column)
+    splits.append(split_column)
 
-    left = (top[0], s[ind(top[0], n, top[1])])
-    optimal.insert(0, left[1])
-    if left[0] != left[1]:
-      queue.insert(0, left)
+class PlanCache:
+  # A bounded LRU cache of plans (cost, optimal) as matrix_chain_mult provides
+  # them, keyed by the dimensions of the chain
+  def __init__(self, maxsize=128):
+    assert 0 < maxsize, "Cache size is assumed to be positive"
+    self.maxsize = maxsize
+    self.hits = 0
+    self.misses = 0
+    self._entries = collections.OrderedDict()
 
-    right = (left[1]+1, top[1])
-    if right[0] != right[1]:
-      pos = 1 if queue[0] == left else 0
-      queue.insert(pos, right)
+  def plan(self, p):
+    p = tuple(p)
+    n = len(p) - 1
+    assert 2 <= n, "At least two matrices are expected"
+    entry = self._entries.get(p)
+    if entry is not None:
+      self.hits = self.hits + 1
+      self._entries.move_to_end(p)
+      return entry['plan']
 
-  return (m[ind(0, n, n-1)], optimal)
+    # Start from the columns of the longest cached prefix of the chain, they
+    # are never modified, so they are shared rather than copied
+    self.misses = self.misses + 1
+    costs, splits = [], []
+    for length in range(len(p) - 1, 2, -1):
+      prefix = self._entries.get(p[:length])
+      if prefix is not None:
+        costs, splits = list(prefix['costs']), list(prefix['splits'])
+        break
+    extend_chain_tables(p, costs, splits)
+
+    plan = (costs[n-1][0], _unwind_splits(n, lambda i, j: splits[j][i]))
+    self._entries[p] = {'costs': costs, 'splits': splits, 'plan': plan}
+    while self.maxsize < len(self._entries):
+      self._entries.popitem(last=False)
+    return plan
+
+  def __len__(self):
+    return len(self._entries)
+
+  def save(self, path):
+    # Store the cached chains from the least to the most recently used one
+    with open(path, 'w') as file:
+      json.dump({'maxsize': self.maxsize,
+                 'entries': [{'p': p, 'costs': entry['costs'], 'splits': entry['splits'], 'plan': entry['plan']}
+                             for p, entry in self._entries.items()]}, file)
+
+  @classmethod
+  def load(cls, path):
+    with open(path) as file:
+      state = json.load(file)
+    cache = cls(state['maxsize'])
+    for entry in state['entries']:
+      cost, optimal = entry['plan']
+      cache._entries[tuple(entry['p'])] = {'costs': entry['costs'], 'splits': entry['splits'],
+                                           'plan': (cost, optimal)}
+    return cache
+
+"""
+Evaluation of the product itself. The splits of an optimal parenthesization
+form a tree, whose independent subtrees are multiplied concurrently on a thread
+pool, since NumPy releases the GIL during matrix multiplication. Every product
+is written to a buffer allocated once, so repeated evaluations of chains of the
+same shape don't allocate
+"""
+class ChainEvaluator:
+  def __init__(self, p, optimal=None, dtype=None, max_workers=None):
+    assert np is not None, "NumPy is required to evaluate products"
+    self.p = tuple(p)
+    n = len(self.p) - 1
+    assert 1 <= n, "At least one matrix is expected"
+    if optimal is None:
+      optimal = matrix_chain_mult(self.p)[1] if 2 <= n else []
+
+    # Split k multiplies Ai..k by Ak+1..j, children of the split are the splits
+    # of these products or None for single matrices. Splits come in an order,
+    # where the products they consist of are computed first
+    self.splits = list(optimal)
+    self.left = {}
+    self.right = {}
+    self.parent = {}
+    self.buffers = {}
+    first = list(range(n))
+    last = list(range(n))
+    producer = {}
+    for k in self.splits:
+      i, j = first[k], last[k+1]
+      self.left[k] = producer.get((i, k))
+      self.right[k] = producer.get((k+1, j))
+      for child in (self.left[k], self.right[k]):
+        if child is not None:
+          self.parent[child] = k
+      producer[(i, j)] = k
+      last[i], first[j] = j, i
+      self.buffers[k] = np.empty((self.p[i], self.p[j+1]), dtype=dtype or np.float64)
+    assert len(self.splits) == n - 1 and (n == 1 or (0, n-1) in producer), \
+      "Splits are expected to parenthesize the whole chain"
+    self.root = producer.get((0, n-1))
+
+    self._pool = concurrent.futures.ThreadPoolExecutor(max_workers)
+
+  def evaluate(self, matrices):
+    # Provide the product of the matrices. It's stored in a buffer, which the
+    # next evaluation overwrites
+    assert len(matrices) == len(self.p) - 1, "A matrix per dimension pair is expected"
+    for i, matrix in enumerate(matrices):
+      assert matrix.shape == (self.p[i], self.p[i+1]), "Matrix " + str(i) + " has an unexpected shape"
+    if self.root is None:
+      return matrices[0]
+
+    # Count children of each split, which are yet to be computed, and start
+    # the splits having none
+    lock = threading.Lock()
+    done = threading.Event()
+    errors = []
+    pending = {k: (self.left[k] is not None) + (self.right[k] is not None) for k in self.splits}
+
+    def operand(child, index):
+      return matrices[index] if child is None else self.buffers[child]
+
+    def multiply(k):
+      try:
+        np.matmul(operand(self.left[k], k), operand(self.right[k], k+1), out=self.buffers[k])
+      except Exception as error:
+        errors.append(error)
+        done.set()
+        return
+
+      if k == self.root:
+        done.set()
+        return
+      parent = self.parent[k]
+      with lock:
+        pending[parent] = pending[parent] - 1
+        ready = pending[parent] == 0
+      if ready:
+        self._pool.submit(multiply, parent)
+
+    for k in [k for k in self.splits if pending[k] == 0]:
+      self._pool.submit(multiply, k)
+    done.wait()
+    if errors:
+      raise errors[0]
+
+    return self.buffers[self.root]
+
+  def close(self):
+    self._pool.shutdown()
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *exc_info):
+    self.close()
+
+def benchmark(sizes=(100, 1000, 5000), seed=15, budget=60):
+  # Compare the approximation against the exact O(n^3) approach, which is
+  # skipped for larger chains once a single run exceeds the budget in seconds
+  import random
+  random.seed(seed)
+  exact = True
+  for n in sizes:
+    p = [random.randint(1, 100) for i in range(n + 1)]
+
+    start = time.perf_counter()
+    approx_cost = matrix_chain_mult_approx(p)[0]
+    approx_elapsed = time.perf_counter() - start
+
+    report = ["n = " + str(n), "approx = " + format(approx_elapsed, '.4f') + "s"]
+    if exact:
+      start = time.perf_counter()
+      exact_cost = matrix_chain_mult(p)[0]
+      exact_elapsed = time.perf_counter() - start
+      exact = exact_elapsed <= budget
+      report.append("exact = " + format(exact_elapsed, '.4f') + "s")
+      report.append("cost ratio = " + format(approx_cost / exact_cost, '.4f'))
+    else:
+      report.append("exact = skipped")
+    print(", ".join(report))
 
 class Tests(unittest.TestCase):
   def test_motivational(self):
@@ -67,5 +358,97 @@ class Tests(unittest.TestCase):
   def test_exercises_15_2_1(self):
     self.assertEqual(matrix_chain_mult((5, 10, 3, 12, 5, 50, 6)), (2010, [4, 2, 3, 0, 1]))
 
+  def test_approx(self):
+    for p in ((10, 100, 5, 50), (30, 35, 15, 5, 10, 20, 25), (5, 10, 3, 12, 5, 50, 6)):
+      self.assertEqual(matrix_chain_mult_approx(p), matrix_chain_mult(p))
+
+  def test_approx_bound(self):
+    import random
+    random.seed(15)
+    for trial in range(300):
+      p = [random.randint(1, 30) for i in range(random.randint(3, 25))]
+      with self.subTest(p=p):
+        cost, optimal = matrix_chain_mult_approx(p)
+        self.assertEqual(sorted(optimal), list(range(len(p) - 2)))
+        self.assertEqual(cost, _evaluate_cost(p, optimal))
+        self.assertLessEqual(cost, 1.155 * matrix_chain_mult(p)[0])
+
+  @unittest.skipIf(np is None, 'NumPy is not available')
+  def test_evaluator(self):
+    rng = np.random.default_rng(16)
+    for p in ((10, 100, 5, 50), (30, 35, 15, 5, 10, 20, 25), (5, 10, 3, 12, 5, 50, 6), (3, 4), (2, 3, 4)):
+      matrices = [rng.standard_normal((p[i], p[i+1])) for i in range(len(p) - 1)]
+      expected = reduce(np.matmul, matrices)
+      with self.subTest(p=p), ChainEvaluator(p, max_workers=3) as evaluator:
+        first = evaluator.evaluate(matrices)
+        self.assertTrue(np.allclose(first, expected))
+        # Buffers are reused by the following evaluations
+        matrices = [2 * matrix for matrix in matrices]
+        second = evaluator.evaluate(matrices)
+        self.assertTrue(len(p) == 2 or second is first)
+        self.assertTrue(np.allclose(second, expected * 2 ** (len(p) - 1)))
+
+    p = [random_size for random_size in rng.integers(1, 40, size=30)]
+    matrices = [rng.standard_normal((p[i], p[i+1])) for i in range(len(p) - 1)]
+    with ChainEvaluator(p, optimal=matrix_chain_mult_approx(p)[1]) as evaluator:
+      self.assertTrue(np.allclose(evaluator.evaluate(matrices), reduce(np.matmul, matrices)))
+      self.assertRaises(AssertionError, evaluator.evaluate, matrices[1:])
+
+  @unittest.skipIf(np is None, 'NumPy is not available')
+  def test_numpy(self):
+    import random
+    random.seed(18)
+    for p in ((10, 100, 5, 50), (30, 35, 15, 5, 10, 20, 25), (5, 10, 3, 12, 5, 50, 6)):
+      self.assertEqual(matrix_chain_mult_numpy(p), matrix_chain_mult(p))
+    for trial in range(100):
+      p = [random.randint(1, 30) for i in range(random.randint(3, 25))]
+      with self.subTest(p=p):
+        self.assertEqual(matrix_chain_mult_numpy(p), matrix_chain_mult(p))
+    p = [random.randint(10 ** 6, 10 ** 7) for i in range(8)]
+    self.assertEqual(matrix_chain_mult_numpy(p), matrix_chain_mult(p))
+
+  def test_plan_cache(self):
+    import os
+    import random
+    import tempfile
+    random.seed(17)
+    cache = PlanCache(maxsize=4)
+    base = [random.randint(1, 50) for i in range(12)]
+    for length in (5, 8, 12, 8, 5, 12):
+      with self.subTest(length=length):
+        self.assertEqual(cache.plan(base[:length]), matrix_chain_mult(base[:length]))
+    self.assertEqual((cache.hits, cache.misses, len(cache)), (3, 3, 3))
+
+    for trial in range(50):
+      p = [random.randint(1, 30) for i in range(random.randint(3, 12))]
+      with self.subTest(p=p):
+        self.assertEqual(cache.plan(p), matrix_chain_mult(p))
+    self.assertEqual(len(cache), 4)
+
+    with tempfile.TemporaryDirectory() as directory:
+      path = os.path.join(directory, 'plans.json')
+      cache.save(path)
+      loaded = PlanCache.load(path)
+    self.assertEqual(list(loaded._entries), list(cache._entries))
+    for p in list(cache._entries):
+      self.assertEqual(loaded.plan(p), cache.plan(p))
+    self.assertEqual(loaded.hits, 4)
+
+def _evaluate_cost(p, optimal):
+  # Carry out multiplications in the given order tracking dimensions of the
+  # products, which are kept by their first and last matrices
+  first = {i: i for i in range(len(p) - 1)}
+  last = {i: i for i in range(len(p) - 1)}
+  cost = 0
+  for k in optimal:
+    i, j = first[k], last[k+1]
+    cost = cost + p[i] * p[k+1] * p[j+1]
+    last[i], first[j] = j, i
+
+  return cost
+
 if __name__ == '__main__':
-  unittest.main()
\ No newline at end of file
+  if '--benchmark' in sys.argv:
+    benchmark()
+  else:
+    unittest.main()
\ No newline at end of file
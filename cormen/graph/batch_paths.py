@@ -0,0 +1,220 @@
+"""
+Path queries for large batches of (source, target) pairs against a single graph.
+
+Offsets and targets of a graph in the compressed sparse row format are copied into
+a block of shared memory once, and every worker of a process pool maps the same block
+when it starts, so the graph is never copied into the workers. Every worker keeps a
+visited mark per vertex, which is the number of the query the vertex was visited by,
+so a new query doesn't have to clear or reallocate the marks. Pairs are sent to the
+workers in chunks, and paths come back in the order the chunks complete.
+"""
+
+import array
+import itertools
+import multiprocessing
+import os
+import random
+import sys
+import time
+from multiprocessing import shared_memory
+
+# Modules shared by the chapters are found in the parent directory
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import csr_graph
+import depth_first_search
+import process_pool
+
+# State of a worker process: the shared memory, offsets and targets of the graph mapped from it,
+# visited marks per vertex and the number of the current query
+_worker_memory = None
+_worker_offsets = None
+_worker_targets = None
+_worker_marks = None
+_worker_epoch = 0
+
+# Marks are 32-bit, so they are cleared once the number of queries overflows
+_EPOCH_LIMIT = 2 ** 32 - 1
+
+
+def _init_worker(name, vertex_count, edge_count, itemsize):
+    global _worker_memory
+    _worker_memory = shared_memory.SharedMemory(name)
+    view = _worker_memory.buf
+    targets_begin = 8 * (vertex_count + 1)
+    _attach(view[:targets_begin].cast('q'), view[targets_begin:targets_begin + itemsize * edge_count]
+            .cast('i' if itemsize == 4 else 'q'), vertex_count)
+
+
+def _attach(offsets, targets, vertex_count):
+    global _worker_offsets, _worker_targets, _worker_marks, _worker_epoch
+    _worker_offsets = offsets
+    _worker_targets = targets
+    _worker_marks = array.array('I', [0]) * vertex_count
+    _worker_epoch = 0
+
+
+def _find(src, tgt):
+    # The same search as depth_first_search.find_path_bitmap does, but the marks are reused across queries
+    global _worker_epoch
+    if src == tgt:
+        return [src, tgt]
+
+    _worker_epoch += 1
+    if _worker_epoch == _EPOCH_LIMIT:
+        _worker_marks[:] = array.array('I', [0]) * len(_worker_marks)
+        _worker_epoch = 1
+    epoch, marks, offsets, targets = _worker_epoch, _worker_marks, _worker_offsets, _worker_targets
+
+    marks[src] = epoch
+    calls, positions = [src], [offsets[src]]
+    while calls:
+        v = calls[-1]
+        position = positions[-1]
+        if position == offsets[v + 1]:
+            calls.pop()
+            positions.pop()
+            continue
+
+        positions[-1] = position + 1
+        nv = targets[position]
+        if marks[nv] == epoch:
+            continue
+        marks[nv] = epoch
+        calls.append(nv)
+        if nv == tgt:
+            return calls
+        positions.append(offsets[nv])
+
+    return []
+
+
+def _find_chunk(chunk):
+    # Provide (index, path) for a chunk of (index, source, target) triples, where paths consist of numbers of vertices
+    return [(index, _find(src, tgt)) for index, src, tgt in chunk]
+
+
+def _chunks(graph, pairs, chunk_size):
+    enumerated = ((index, graph.index_of(srcId), graph.index_of(tgtId)) for index, (srcId, tgtId) in enumerate(pairs))
+    while True:
+        chunk = list(itertools.islice(enumerated, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def iterate_batch_paths(graph, pairs, processes=None, chunk_size=64):
+    """
+    Finds paths for a batch of pairs of vertices in parallel, the pairs are consumed lazily:
+    at most two chunks per process are in flight
+
+    Parameters
+    ----------
+    graph : csr_graph.CSRGraph or csr_file.MappedCSRGraph
+        A graph in the compressed sparse row format
+
+    pairs : iterable of (object, object)
+        Ids of the source and target vertices
+
+    processes : int, optional
+        The number of worker processes, all the cores by default. A single process
+        answers the queries in place without shared memory
+
+    chunk_size : int
+        The number of pairs to send to a worker at a time
+
+    Yields
+    ------
+    (int, [object, ...])
+        A position of a pair among the pairs and a path between its vertices (as
+        depth_first_search.find_path_bitmap finds it) in the order of completion
+    """
+    assert 0 < chunk_size, "Chunk size is assumed to be positive"
+
+    def to_ids(results):
+        for index, path in results:
+            yield (index, [graph.id_of(v) for v in path])
+
+    if processes == 1:
+        _attach(graph.offsets, graph.targets, len(graph))
+        for chunk in _chunks(graph, pairs, chunk_size):
+            yield from to_ids(_find_chunk(chunk))
+        return
+
+    itemsize = graph.targets.itemsize
+    offsets_size, targets_size = 8 * len(graph.offsets), itemsize * len(graph.targets)
+    memory = shared_memory.SharedMemory(create=True, size=offsets_size + targets_size)
+    try:
+        memory.buf[:offsets_size] = memoryview(graph.offsets).cast('B')
+        memory.buf[offsets_size:offsets_size + targets_size] = memoryview(graph.targets).cast('B')
+        with multiprocessing.Pool(processes, initializer=_init_worker,
+                                  initargs=(memory.name, len(graph), len(graph.targets), itemsize)) as pool:
+            for results in process_pool.imap_bounded(pool, _find_chunk, _chunks(graph, pairs, chunk_size), processes):
+                yield from to_ids(results)
+    finally:
+        memory.close()
+        memory.unlink()
+
+
+def benchmark(vertex_count=100000, degree=4, queries=200, seed=25):
+    # Compare serial find_path_bitmap calls with the batch approach over growing numbers of processes
+    generator = random.Random(seed)
+    graph = csr_graph.CSRGraph.from_edges(((v, generator.randrange(vertex_count))
+                                           for v in range(vertex_count) for _ in range(degree)), intern=False,
+                                          vertex_count=vertex_count)
+    pairs = [(generator.randrange(vertex_count), generator.randrange(vertex_count)) for _ in range(queries)]
+
+    start = time.perf_counter()
+    expected = [depth_first_search.find_path_bitmap(graph, srcId, tgtId) for srcId, tgtId in pairs]
+    print('serial find_path_bitmap =', format(time.perf_counter() - start, '.3f') + 's')
+
+    for processes in sorted({1, 2, 4, multiprocessing.cpu_count()}):
+        start = time.perf_counter()
+        actual = dict(iterate_batch_paths(graph, pairs, processes=processes))
+        assert [actual[i] for i in range(queries)] == expected
+        print('processes =', processes, 'batch =', format(time.perf_counter() - start, '.3f') + 's')
+
+
+if __name__ == '__main__':
+    import unittest
+
+    class BatchPaths(unittest.TestCase):
+        def test_paths(self):
+            generator = random.Random(25)
+            vertex_count = 60
+            edges = [(generator.randrange(vertex_count), generator.randrange(vertex_count)) for _ in range(90)]
+            for graph in (csr_graph.CSRGraph.from_edges(edges, intern=False, vertex_count=vertex_count),
+                          csr_graph.CSRGraph.from_edges((('v' + str(v), 'v' + str(w)) for v, w in edges))):
+                pairs = [(graph.id_of(generator.randrange(len(graph))), graph.id_of(generator.randrange(len(graph))))
+                         for _ in range(500)]
+                expected = [depth_first_search.find_path_bitmap(graph, srcId, tgtId) for srcId, tgtId in pairs]
+                for processes in (1, 2):
+                    with self.subTest(processes=processes, ids=graph.ids is not None):
+                        results = list(iterate_batch_paths(graph, iter(pairs), processes=processes, chunk_size=7))
+                        self.assertEqual(sorted(index for index, _ in results), list(range(len(pairs))))
+                        self.assertEqual([dict(results)[i] for i in range(len(pairs))], expected)
+
+        def test_lazy(self):
+            # Pairs are drawn only as fast as paths are consumed
+            graph = csr_graph.CSRGraph.from_edges([(0, 1), (1, 2)], intern=False)
+            drawn = []
+
+            def pairs():
+                for _ in range(10000):
+                    drawn.append(None)
+                    yield (0, 2)
+
+            results = iterate_batch_paths(graph, pairs(), processes=2, chunk_size=10)
+            self.assertEqual(next(results)[1], [0, 1, 2])
+            self.assertLessEqual(len(drawn), (2 * 2 + 1) * 10)
+            results.close()
+
+        def test_empty(self):
+            graph = csr_graph.CSRGraph.from_edges([], intern=False, vertex_count=3)
+            self.assertEqual(dict(iterate_batch_paths(graph, [(0, 1), (2, 2)], processes=2)), {0: [], 1: [2, 2]})
+            self.assertEqual(list(iterate_batch_paths(graph, [], processes=2)), [])
+
+    if '--benchmark' in sys.argv:
+        benchmark()
+    else:
+        unittest.main()
@@ -0,0 +1,270 @@
+"""
+T. H. Cormen et. al. - Introduction to Algorithms, 3rd edition, ISBN 978-0262033848
+22.2 Breadth-first search (p. 594)
+
+Given a graph G = (V, E) and a distinguished source vertex s, breadth-first search
+systematically explores the edges of G to "discover" every vertex that is reachable
+from s. It computes the distance (smallest number of edges) from s to each reachable
+vertex. The algorithm discovers all vertices at distance k from s before discovering
+any vertices at distance k + 1
+
+A bidirectional search runs two breadth-first searches at once: forward from the source
+and backward from the target over the reversed edges, until their frontiers meet. If
+vertices have about b neighbors, and the target is d edges away, it expands O(b^(d/2))
+vertices instead of O(b^d)
+"""
+
+import collections
+import random
+import sys
+import time
+
+import depth_first_search
+
+def reverse_adjacency(graph):
+    """
+    Reverses all the edges of a graph in O(V + E) time
+
+    Parameters
+    ----------
+    graph : {int: (int, ...)}
+        An adjacency list
+
+    Returns
+    -------
+    {int: (int, ...)}
+        The adjacency list of the reversed graph, with a key per vertex of the graph
+    """
+    reverse = {vId: [] for vId in graph}
+    for vId in graph:
+        for nvId in graph[vId]:
+            reverse.setdefault(nvId, []).append(vId)
+
+    return {vId: tuple(pvIds) for vId, pvIds in reverse.items()}
+
+def find_shortest_path(graph, srcId, tgtId):
+    """
+    Finds a path with the fewest edges between given vertices in O(V + E) time
+
+    Parameters
+    ----------
+    graph : {int: (int, ...)}
+        An adjacency list
+
+    srcId, tgtId : int
+        Ids of the source and target vertices
+
+    Returns
+    -------
+    [int, ...]
+        A shortest path between the source and target vertices, [srcId, tgtId] if
+        they are the same, and [] if the target is not reachable (as find_path does)
+    """
+    return _breadth_first(graph, srcId, tgtId)[0]
+
+def find_shortest_path_bidirectional(graph, srcId, tgtId, reverse=None):
+    """
+    Finds a path with the fewest edges between given vertices in O(V + E) time,
+    searching from both of them, the smaller frontier is expanded first
+
+    Parameters
+    ----------
+    graph : {int: (int, ...)}
+        An adjacency list
+
+    srcId, tgtId : int
+        Ids of the source and target vertices
+
+    reverse : {int: (int, ...)}, optional
+        The reversed adjacency list as reverse_adjacency provides it, to reuse it across queries
+
+    Returns
+    -------
+    [int, ...]
+        A shortest path between the source and target vertices, [srcId, tgtId] if
+        they are the same, and [] if the target is not reachable (as find_path does)
+    """
+    if reverse is None:
+        reverse = reverse_adjacency(graph)
+
+    return _bidirectional(graph, reverse, srcId, tgtId)[0]
+
+def _unwind(previous, vId):
+    # Follow previous vertices from the given one, None stands for no previous vertex
+    path = []
+    while vId is not None:
+        path.append(vId)
+        vId = previous[vId]
+
+    return path
+
+def _breadth_first(graph, srcId, tgtId):
+    # Provide the path and the number of expanded vertices
+    if srcId == tgtId:
+        return ([srcId, tgtId], 0)
+
+    previous = {srcId: None}
+    queue = collections.deque([srcId])
+    expanded = 0
+    while queue:
+        vId = queue.popleft()
+        expanded += 1
+        for nvId in graph.get(vId, ()):
+            if nvId in previous:
+                continue
+            previous[nvId] = vId
+            if nvId == tgtId:
+                return (_unwind(previous, tgtId)[::-1], expanded)
+            queue.append(nvId)
+
+    return ([], expanded)
+
+def _bidirectional(graph, reverse, srcId, tgtId):
+    # Provide the path and the number of expanded vertices
+    if srcId == tgtId:
+        return ([srcId, tgtId], 0)
+
+    # Previous vertices towards the source, next vertices towards the target,
+    # and distances from the source and to the target
+    previous, following = {srcId: None}, {tgtId: None}
+    distance_from, distance_to = {srcId: 0}, {tgtId: 0}
+    frontier_from, frontier_to = [srcId], [tgtId]
+    expanded = 0
+    while frontier_from and frontier_to:
+        # Expand a whole level of the smaller frontier
+        forward = len(frontier_from) <= len(frontier_to)
+        if forward:
+            frontier, adjacency, parents, distances = frontier_from, graph, previous, distance_from
+            others, other_distances = following, distance_to
+        else:
+            frontier, adjacency, parents, distances = frontier_to, reverse, following, distance_to
+            others, other_distances = previous, distance_from
+
+        meeting = None
+        level = []
+        for vId in frontier:
+            expanded += 1
+            for nvId in adjacency.get(vId, ()):
+                if nvId in others:
+                    # The searches met, the shortest path is among the ones through this level
+                    length = distances[vId] + 1 + other_distances[nvId]
+                    if meeting is None or length < meeting[0]:
+                        meeting = (length, vId, nvId)
+                if nvId in parents:
+                    continue
+                parents[nvId] = vId
+                distances[nvId] = distances[vId] + 1
+                level.append(nvId)
+
+        if meeting is not None:
+            _, vId, nvId = meeting
+            if not forward:
+                vId, nvId = nvId, vId
+            return (_unwind(previous, vId)[::-1] + _unwind(following, nvId), expanded)
+
+        if forward:
+            frontier_from = level
+        else:
+            frontier_to = level
+
+    return ([], expanded)
+
+def benchmark(vertex_count=100000, degree=8, queries=200, seed=23):
+    """
+    Compares the numbers of expanded vertices and the time of the searches on a random
+    graph with a few high-degree hubs, as social graphs have
+    """
+    generator = random.Random(seed)
+    hubs = range(vertex_count // 1000)
+    graph = {}
+    for vId in range(vertex_count):
+        neighbors = {generator.randrange(vertex_count) for _ in range(degree)}
+        if generator.random() < 0.2:
+            neighbors.add(generator.choice(hubs))
+        graph[vId] = tuple(neighbors)
+    for vId in hubs:
+        graph[vId] = tuple(set(graph[vId]) | {generator.randrange(vertex_count) for _ in range(10 * degree)})
+
+    start = time.perf_counter()
+    reverse = reverse_adjacency(graph)
+    print('reverse adjacency =', format(time.perf_counter() - start, '.3f') + 's')
+
+    pairs = [(generator.randrange(vertex_count), generator.randrange(vertex_count)) for _ in range(queries)]
+    for name, search in (('bfs', lambda srcId, tgtId: _breadth_first(graph, srcId, tgtId)),
+                         ('bidirectional', lambda srcId, tgtId: _bidirectional(graph, reverse, srcId, tgtId))):
+        start = time.perf_counter()
+        results = [search(srcId, tgtId) for srcId, tgtId in pairs]
+        elapsed = time.perf_counter() - start
+        print(name, '=', format(elapsed / queries * 1e3, '.3f') + 'ms per query,',
+              'expanded =', sum(expanded for _, expanded in results) // queries, 'per query,',
+              'length =', format(sum(len(path) for path, _ in results) / queries, '.2f'))
+
+    # The depth-first search explores most of the graph per query, so it gets fewer of them
+    start = time.perf_counter()
+    paths = [depth_first_search.find_path(graph, srcId, tgtId) for srcId, tgtId in pairs[:queries // 10]]
+    elapsed = time.perf_counter() - start
+    print('dfs =', format(elapsed / len(paths) * 1e3, '.3f') + 'ms per query,',
+          'length =', format(sum(map(len, paths)) / len(paths), '.2f'))
+
+if __name__ == '__main__':
+    import unittest
+
+    class BFS(unittest.TestCase):
+        def test_fig_22_3(self):
+            # The undirected graph of Figure 22.3 as a directed one with edges both ways
+            edges = ('rs', 'rv', 'sw', 'wt', 'wx', 'tx', 'tu', 'xu', 'xy', 'uy')
+            graph = {}
+            for vId, nvId in edges:
+                graph.setdefault(vId, []).append(nvId)
+                graph.setdefault(nvId, []).append(vId)
+            reverse = reverse_adjacency(graph)
+
+            distances = {'r': 1, 's': 0, 't': 2, 'u': 3, 'v': 2, 'w': 1, 'x': 2, 'y': 3}
+            for tgtId, distance in distances.items():
+                for search in (find_shortest_path,
+                               lambda graph, srcId, tgtId: find_shortest_path_bidirectional(graph, srcId, tgtId,
+                                                                                             reverse)):
+                    with self.subTest(tgtId=tgtId, search=search):
+                        path = search(graph, 's', tgtId)
+                        self.assertEqual(len(path), distance + 1 if distance else 2)
+                        self.assertEqual((path[0], path[-1]), ('s', tgtId))
+                        for vId, nvId in zip(path, path[1:]) if distance else ():
+                            self.assertIn(nvId, graph[vId])
+
+        def test_random(self):
+            generator = random.Random(23)
+            for _ in range(50):
+                vertex_count = generator.randint(1, 30)
+                graph = {vId: tuple(generator.sample(range(vertex_count), generator.randint(0, min(3, vertex_count))))
+                         for vId in range(vertex_count)}
+                reverse = reverse_adjacency(graph)
+                for srcId in graph:
+                    for tgtId in graph:
+                        with self.subTest(graph=graph, srcId=srcId, tgtId=tgtId):
+                            path = find_shortest_path(graph, srcId, tgtId)
+                            self.assertEqual(bool(path), bool(depth_first_search.find_path(graph, srcId, tgtId)))
+                            bidirectional = find_shortest_path_bidirectional(graph, srcId, tgtId, reverse)
+                            self.assertEqual(len(bidirectional), len(path))
+                            if srcId != tgtId and path:
+                                self.assertEqual((bidirectional[0], bidirectional[-1]), (srcId, tgtId))
+                                for vId, nvId in zip(bidirectional, bidirectional[1:]):
+                                    self.assertIn(nvId, graph[vId])
+
+        def test_expanded(self):
+            # A complete binary tree with edges both ways: the bidirectional search expands far fewer vertices
+            depth = 12
+            graph = {vId: [] for vId in range(1, 2 ** depth)}
+            for vId in range(2, 2 ** depth):
+                graph[vId].append(vId // 2)
+                graph[vId // 2].append(vId)
+            srcId, tgtId = 2 ** (depth - 1), 2 ** depth - 1
+            path, expanded = _breadth_first(graph, srcId, tgtId)
+            bidirectional, expanded_bidirectional = _bidirectional(graph, reverse_adjacency(graph), srcId, tgtId)
+            self.assertEqual(len(path), len(bidirectional))
+            self.assertEqual(len(path), 2 * depth - 1)
+            self.assertLess(4 * expanded_bidirectional, expanded)
+
+    if '--benchmark' in sys.argv:
+        benchmark()
+    else:
+        unittest.main()
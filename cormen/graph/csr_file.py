@@ -0,0 +1,399 @@
+"""
+A binary on-disk format of graphs in the compressed sparse row (CSR) format, which is
+memory-mapped instead of being loaded.
+
+A file starts with a header:
+    magic b'CSRG', version (uint16), size of targets in bytes (uint8, 4 or 8),
+    kind of the id table (uint8), the number of vertices V (uint64),
+    the number of edges E (uint64) and the position of the id table (uint64)
+followed by V + 1 offsets (int64) and E targets (int32 or int64). All numbers are
+little-endian. The id table is optional, it starts at a multiple of 8 bytes and holds
+either V ids (int64), or V + 1 offsets (int64) of ids in the UTF-8 blob following them.
+It is followed by a hash table of ids at the next multiple of 8 bytes: the smallest
+power of two no less than 2V of slots (int64) holding numbers of vertices plus one,
+or zeros for empty slots, collisions are resolved by linear probing. So ids are
+looked up through the mapping as well, without loading them.
+
+The file is written from a stream of edges keeping only O(V) integers in memory: edges
+are spooled into a temporary file, while degrees of vertices are counted, and then are
+scattered into the memory-mapped targets.
+"""
+
+import array
+import hashlib
+import mmap
+import os
+import struct
+import sys
+import tempfile
+
+import csr_graph
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+MAGIC = b'CSRG'
+VERSION = 2
+
+_HEADER = struct.Struct('<4sHBBQQQ')
+
+# Kinds of the id table
+_NO_IDS, _INT_IDS, _STR_IDS = 0, 1, 2
+
+# Number of edges to spool or scatter at a time
+_CHUNK_SIZE = 1 << 16
+
+
+def _align(position):
+    return (position + 7) & ~7
+
+
+def _slot_count(vertex_count):
+    # The number of slots of the hash table of ids, at most a half of them are used
+    return 1 << (2 * vertex_count - 1).bit_length() if vertex_count else 1
+
+
+def _hash_id(encoded):
+    # A hash of an encoded id, which stays the same across processes
+    return int.from_bytes(hashlib.blake2b(encoded, digest_size=8).digest(), 'little')
+
+
+def _encode_id(vId):
+    if isinstance(vId, str):
+        return vId.encode('utf-8')
+
+    return vId.to_bytes(8, 'little', signed=True)
+
+
+def write_csr(path, edges, intern=True, vertex_count=None):
+    """
+    Writes a graph to a file in O(V + E) time and O(V) memory, edges leaving a vertex keep their order
+
+    Parameters
+    ----------
+    path : str
+        A path of the file to write
+
+    edges : iterable of (object, object)
+        Pairs of ids of the source and target vertices, which are either all integers or all strings
+
+    intern : bool
+        Whether to intern the ids and store them in the id table, otherwise they are expected
+        to be non-negative integers, and all the integers up to the largest one become vertices
+
+    vertex_count : int, optional
+        The number of vertices, if the ids are not interned, for graphs with isolated vertices at the end
+    """
+    ids = [] if intern else None
+    indices = {}
+    degrees = array.array('q')
+    edge_count = 0
+
+    with tempfile.TemporaryFile() as spool:
+        chunk = array.array('q')
+        for srcId, tgtId in edges:
+            if intern:
+                for vId in (srcId, tgtId):
+                    if vId not in indices:
+                        indices[vId] = len(ids)
+                        ids.append(vId)
+                srcId, tgtId = indices[srcId], indices[tgtId]
+            elif srcId < 0 or tgtId < 0:
+                raise ValueError("Vertices are expected to be non-negative integers")
+
+            if len(degrees) <= max(srcId, tgtId):
+                degrees.extend([0] * (max(srcId, tgtId) + 1 - len(degrees)))
+            degrees[srcId] += 1
+            chunk.append(srcId)
+            chunk.append(tgtId)
+            edge_count += 1
+            if len(chunk) == 2 * _CHUNK_SIZE:
+                chunk.tofile(spool)
+                del chunk[:]
+        chunk.tofile(spool)
+        del indices
+
+        if vertex_count is None or intern:
+            vertex_count = len(degrees)
+        elif vertex_count < len(degrees):
+            raise ValueError("Edges refer to vertices beyond the number of vertices")
+        degrees.extend([0] * (vertex_count - len(degrees)))
+
+        # Turn the degrees into the offsets in place
+        offset = 0
+        for v in range(vertex_count):
+            offset, degrees[v] = offset + degrees[v], offset
+        offsets = degrees
+        offsets.append(offset)
+
+        itemsize = 4 if vertex_count <= 2 ** 31 else 8
+        targets_begin = _HEADER.size + 8 * (vertex_count + 1)
+        ids_begin = _align(targets_begin + itemsize * edge_count)
+        kind = _NO_IDS
+        if intern:
+            if all(isinstance(vId, int) for vId in ids):
+                kind = _INT_IDS
+            elif all(isinstance(vId, str) for vId in ids):
+                kind = _STR_IDS
+            else:
+                raise ValueError("Ids are expected to be either all integers or all strings")
+
+        with open(path, 'w+b') as file:
+            file.write(_HEADER.pack(MAGIC, VERSION, itemsize, kind, vertex_count, edge_count,
+                                    ids_begin if kind != _NO_IDS else 0))
+            offsets.tofile(file)
+            file.truncate(ids_begin)
+            if 0 < edge_count:
+                spool.seek(0)
+                _scatter(file, spool, offsets, targets_begin, itemsize, edge_count)
+
+            file.seek(ids_begin)
+            if kind == _INT_IDS:
+                array.array('q', ids).tofile(file)
+            elif kind == _STR_IDS:
+                _write_strings(file, ids)
+            if kind != _NO_IDS:
+                file.seek(_align(file.tell()))
+                _write_hash_table(file, ids)
+
+
+def _scatter(file, spool, offsets, targets_begin, itemsize, edge_count):
+    # Place spooled edges at the next free positions of their sources, offsets are already written,
+    # so they are advanced in place
+    with mmap.mmap(file.fileno(), 0) as data:
+        with memoryview(data) as view:
+            targets = view[targets_begin:targets_begin + itemsize * edge_count].cast('i' if itemsize == 4 else 'q')
+            try:
+                while True:
+                    chunk = array.array('q')
+                    chunk.frombytes(spool.read(16 * _CHUNK_SIZE))
+                    if not chunk:
+                        break
+                    for index in range(0, len(chunk), 2):
+                        srcId = chunk[index]
+                        targets[offsets[srcId]] = chunk[index + 1]
+                        offsets[srcId] += 1
+            finally:
+                targets.release()
+
+
+def _write_strings(file, ids):
+    encoded = [vId.encode('utf-8') for vId in ids]
+    positions = array.array('q', [0])
+    for value in encoded:
+        positions.append(positions[-1] + len(value))
+    positions.tofile(file)
+    for value in encoded:
+        file.write(value)
+
+
+def _write_hash_table(file, ids):
+    slots = array.array('q', [0]) * _slot_count(len(ids))
+    mask = len(slots) - 1
+    for index, vId in enumerate(ids):
+        slot = _hash_id(_encode_id(vId)) & mask
+        while slots[slot]:
+            slot = (slot + 1) & mask
+        slots[slot] = index + 1
+    slots.tofile(file)
+
+
+class MappedCSRGraph:
+    """
+    A graph memory-mapped from a file written by write_csr. Offsets and targets are
+    memoryviews of the mapped file, so they are read on demand and never copied.
+    It provides the same interface as csr_graph.CSRGraph, so search functions accept it
+
+    Parameters
+    ----------
+    path : str
+        A path of the file to map
+    """
+
+    def __init__(self, path):
+        assert sys.byteorder == 'little', "Mapped numbers are little-endian"
+        self.offsets = self.targets = self._ids = self._positions = self._slots = None
+        with open(path, 'rb') as file:
+            self._data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._data)
+
+        magic, version, itemsize, kind, vertex_count, edge_count, ids_begin = _HEADER.unpack_from(self._data)
+        if magic != MAGIC or version != VERSION or itemsize not in (4, 8):
+            self.close()
+            raise ValueError("'" + str(path) + "' is not a graph file of a supported version")
+
+        targets_begin = _HEADER.size + 8 * (vertex_count + 1)
+        self.offsets = self._view[_HEADER.size:targets_begin].cast('q')
+        self.targets = self._view[targets_begin:targets_begin + itemsize * edge_count].cast('i' if itemsize == 4
+                                                                                            else 'q')
+        self._kind = kind
+        if kind == _INT_IDS:
+            self._ids = self._view[ids_begin:ids_begin + 8 * vertex_count].cast('q')
+            slots_begin = _align(ids_begin + 8 * vertex_count)
+        elif kind == _STR_IDS:
+            blob_begin = ids_begin + 8 * (vertex_count + 1)
+            self._positions = self._view[ids_begin:blob_begin].cast('q')
+            blob_end = blob_begin + self._positions[vertex_count]
+            self._ids = self._view[blob_begin:blob_end]
+            slots_begin = _align(blob_end)
+        if kind != _NO_IDS:
+            self._slots = self._view[slots_begin:slots_begin + 8 * _slot_count(vertex_count)].cast('q')
+
+    def close(self):
+        for view in (self.offsets, self.targets, self._ids, self._positions, self._slots):
+            if view is not None:
+                view.release()
+        self._view.release()
+        self._data.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exception):
+        self.close()
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    @property
+    def edge_count(self):
+        return len(self.targets)
+
+    def index_of(self, vId):
+        """
+        Provides the number of the vertex with the given id, interned ids are looked up
+        in the mapped hash table in O(1) expected time
+        """
+        if self._kind == _NO_IDS:
+            if not (isinstance(vId, int) and 0 <= vId < len(self)):
+                raise KeyError(vId)
+            return vId
+
+        if not isinstance(vId, str if self._kind == _STR_IDS else int) or isinstance(vId, bool):
+            raise KeyError(vId)
+        try:
+            encoded = _encode_id(vId)
+        except OverflowError:
+            raise KeyError(vId) from None
+
+        slots = self._slots
+        mask = len(slots) - 1
+        slot = _hash_id(encoded) & mask
+        while slots[slot]:
+            index = slots[slot] - 1
+            if self._kind == _INT_IDS:
+                if self._ids[index] == vId:
+                    return index
+            elif self._ids[self._positions[index]:self._positions[index + 1]] == encoded:
+                return index
+            slot = (slot + 1) & mask
+
+        raise KeyError(vId)
+
+    def id_of(self, index):
+        """
+        Provides the id of the vertex with the given number
+        """
+        if self._kind == _NO_IDS:
+            return index
+        if self._kind == _INT_IDS:
+            return self._ids[index]
+
+        return str(self._ids[self._positions[index]:self._positions[index + 1]], 'utf-8')
+
+    def neighbors(self, index):
+        """
+        Provides the numbers of the vertices adjacent to the vertex with the given number
+        """
+        return self.targets[self.offsets[index]:self.offsets[index + 1]]
+
+    def as_numpy(self):
+        """
+        Provides offsets and targets as NumPy arrays sharing the mapped memory
+        """
+        assert np is not None, "NumPy is required"
+        return (np.frombuffer(self.offsets, dtype='<i8'),
+                np.frombuffer(self.targets, dtype='<i4' if self.targets.itemsize == 4 else '<i8'))
+
+
+if __name__ == '__main__':
+    import random
+    import unittest
+
+    import depth_first_search
+
+    class CSRFile(unittest.TestCase):
+        def setUp(self):
+            self.directory = tempfile.TemporaryDirectory()
+            self.path = os.path.join(self.directory.name, 'graph.csr')
+
+        def tearDown(self):
+            self.directory.cleanup()
+
+        def assertSameGraph(self, mapped, graph):
+            self.assertEqual(len(mapped), len(graph))
+            self.assertEqual(list(mapped.offsets), list(graph.offsets))
+            self.assertEqual(list(mapped.targets), list(graph.targets))
+            for index in range(len(graph)):
+                self.assertEqual(mapped.id_of(index), graph.id_of(index))
+                self.assertEqual(mapped.index_of(graph.id_of(index)), index)
+
+        def test_ids(self):
+            for edges in ([('u', 'v'), ('w', 'y'), ('u', 'x'), ('v', 'y'), ('y', 'x'), ('x', 'v'), ('w', 'z'),
+                           ('z', 'z'), ('ü', 'u')],
+                          [(10, 20), (20, 0), (0, 10), (5, 0)]):
+                with self.subTest(edges=edges):
+                    write_csr(self.path, iter(edges))
+                    with MappedCSRGraph(self.path) as mapped:
+                        self.assertSameGraph(mapped, csr_graph.CSRGraph.from_edges(edges))
+
+        def test_random(self):
+            generator = random.Random(24)
+            for _ in range(20):
+                vertex_count = generator.randint(1, 50)
+                edges = [(generator.randrange(vertex_count), generator.randrange(vertex_count))
+                         for _ in range(generator.randint(0, 100))]
+                write_csr(self.path, edges, intern=False, vertex_count=vertex_count)
+                graph = csr_graph.CSRGraph.from_edges(edges, intern=False, vertex_count=vertex_count)
+                with MappedCSRGraph(self.path) as mapped:
+                    self.assertSameGraph(mapped, graph)
+                    if np is not None:
+                        offsets, targets = mapped.as_numpy()
+                        self.assertEqual(offsets.tolist(), list(graph.offsets))
+                        self.assertEqual(targets.tolist(), list(graph.targets))
+                        del offsets, targets
+                    for v in range(vertex_count):
+                        for w in range(vertex_count):
+                            expected = depth_first_search.find_path_csr(graph, v, w)
+                            self.assertEqual(depth_first_search.find_path_csr(mapped, v, w), expected)
+                            path = depth_first_search.find_path_bitmap(mapped, v, w)
+                            self.assertEqual(bool(path), bool(expected))
+                            if path and v != w:
+                                self.assertEqual((path[0], path[-1]), (v, w))
+                                for vId, nvId in zip(path, path[1:]):
+                                    self.assertIn(nvId, list(mapped.neighbors(vId)))
+
+        def test_invalid(self):
+            with open(self.path, 'wb') as file:
+                file.write(b'\0' * 64)
+            self.assertRaises(ValueError, MappedCSRGraph, self.path)
+            self.assertRaises(ValueError, write_csr, self.path, [(1, 'a')])
+
+        def test_lookup(self):
+            for ids in (['v' + str(v) for v in range(1000)], [v * 7919 - 3000 for v in range(1000)]):
+                with self.subTest(ids=ids[:2]):
+                    write_csr(self.path, zip(ids, ids[1:] + ids[:1]))
+                    with MappedCSRGraph(self.path) as mapped:
+                        self.assertEqual([mapped.index_of(vId) for vId in ids], list(range(len(ids))))
+                        for missing in ('x', 1, 2 ** 70, None, True):
+                            self.assertRaises(KeyError, mapped.index_of, missing)
+
+    if '--convert' in sys.argv:
+        # Convert an edge list of whitespace-separated pairs of ids into a graph file
+        source, target = sys.argv[sys.argv.index('--convert') + 1:][:2]
+        with open(source) as lines:
+            write_csr(target, (tuple(line.split()) for line in lines if line.strip()))
+    else:
+        unittest.main()
@@ -0,0 +1,230 @@
+"""
+A compact representation of a directed graph in the compressed sparse row (CSR) format.
+
+Vertices are numbered 0, 1, ..., V - 1. Targets of edges leaving the vertex v are stored
+at targets[offsets[v]:offsets[v + 1]], so the whole graph takes two flat arrays of integers
+instead of a dictionary of tuples. Arbitrary hashable vertex ids are interned to these
+numbers, and the ids are kept in a list to map the numbers back.
+"""
+
+import array
+
+
+class CSRGraph:
+    """
+    A directed graph in the compressed sparse row format
+
+    Parameters
+    ----------
+    offsets : array('q')
+        Offsets of the adjacency lists of the vertices in targets, followed by the number of edges
+
+    targets : array
+        Concatenated adjacency lists of the vertices
+
+    ids : [object, ...], optional
+        Ids of the vertices, the vertices are their own ids, if omitted
+    """
+
+    def __init__(self, offsets, targets, ids=None):
+        assert 0 < len(offsets) and offsets[-1] == len(targets), "Offsets are expected to end with the number of edges"
+        assert ids is None or len(ids) == len(offsets) - 1, "An id per vertex is expected"
+
+        self.offsets = offsets
+        self.targets = targets
+        self.ids = ids
+        self._indices = None if ids is None else {vId: index for index, vId in enumerate(ids)}
+
+    @classmethod
+    def from_adjacency(cls, graph):
+        """
+        Builds a graph from an adjacency list in O(V + E) time
+
+        Parameters
+        ----------
+        graph : {object: (object, ...)}
+            An adjacency list, vertices appearing only as targets are added as well
+
+        Returns
+        -------
+        CSRGraph
+            The graph, where vertices are numbered in the order of their first appearance
+        """
+        ids = list(graph)
+        indices = {vId: index for index, vId in enumerate(ids)}
+
+        offsets = array.array('q', [0])
+        targets = array.array('q')
+        for vId in graph:
+            for nvId in graph[vId]:
+                if nvId not in indices:
+                    indices[nvId] = len(ids)
+                    ids.append(nvId)
+                targets.append(indices[nvId])
+            offsets.append(len(targets))
+        offsets.extend([len(targets)] * (len(ids) - len(offsets) + 1))
+
+        return cls(offsets, _narrow(targets, len(ids)), ids)
+
+    @classmethod
+    def from_edges(cls, edges, intern=True, vertex_count=None):
+        """
+        Builds a graph from an iterable of edges in O(V + E) time, edges leaving a vertex keep their order
+
+        Parameters
+        ----------
+        edges : iterable of (object, object)
+            Pairs of ids of the source and target vertices
+
+        intern : bool
+            Whether to intern the ids, otherwise they are expected to be non-negative integers,
+            and all the integers up to the largest one become vertices
+
+        vertex_count : int, optional
+            The number of vertices, if the ids are not interned, for graphs with isolated vertices at the end
+
+        Returns
+        -------
+        CSRGraph
+            The graph, where vertices are numbered in the order of their first appearance, if interned
+        """
+        ids = [] if intern else None
+        indices = {}
+        sources = array.array('q')
+        targets = array.array('q')
+        for srcId, tgtId in edges:
+            if intern:
+                for vId in (srcId, tgtId):
+                    if vId not in indices:
+                        indices[vId] = len(ids)
+                        ids.append(vId)
+                srcId, tgtId = indices[srcId], indices[tgtId]
+            elif srcId < 0 or tgtId < 0:
+                raise ValueError("Vertices are expected to be non-negative integers")
+            sources.append(srcId)
+            targets.append(tgtId)
+
+        if intern:
+            vertex_count = len(ids)
+        else:
+            largest = max(max(sources, default=-1), max(targets, default=-1))
+            if vertex_count is None:
+                vertex_count = largest + 1
+            elif vertex_count <= largest:
+                raise ValueError("Edges refer to vertices beyond the number of vertices")
+        offsets, targets = _sort_by_source(sources, targets, vertex_count)
+
+        return cls(offsets, _narrow(targets, vertex_count), ids)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    @property
+    def edge_count(self):
+        return len(self.targets)
+
+    def index_of(self, vId):
+        """
+        Provides the number of the vertex with the given id
+        """
+        if self._indices is None:
+            if not (isinstance(vId, int) and 0 <= vId < len(self)):
+                raise KeyError(vId)
+            return vId
+
+        return self._indices[vId]
+
+    def id_of(self, index):
+        """
+        Provides the id of the vertex with the given number
+        """
+        return index if self.ids is None else self.ids[index]
+
+    def neighbors(self, index):
+        """
+        Provides the numbers of the vertices adjacent to the vertex with the given number
+        """
+        return self.targets[self.offsets[index]:self.offsets[index + 1]]
+
+    def reverse(self):
+        """
+        Builds the graph with all the edges reversed in O(V + E) time, it shares the ids with this one
+
+        Returns
+        -------
+        CSRGraph
+            The reversed graph, where adjacency lists keep the order of the sources
+        """
+        sources = array.array('q')
+        for index in range(len(self)):
+            sources.extend([index] * (self.offsets[index + 1] - self.offsets[index]))
+
+        offsets, targets = _sort_by_source(array.array('q', self.targets), sources, len(self))
+        reversed_graph = CSRGraph(offsets, _narrow(targets, len(self)))
+        reversed_graph.ids, reversed_graph._indices = self.ids, self._indices
+
+        return reversed_graph
+
+
+def _sort_by_source(sources, targets, vertex_count):
+    # Counting sort of edges by their sources, which keeps the order of edges leaving a vertex
+    offsets = array.array('q', [0]) * (vertex_count + 1)
+    for srcId in sources:
+        offsets[srcId + 1] += 1
+    for index in range(vertex_count):
+        offsets[index + 1] += offsets[index]
+
+    positions = array.array('q', offsets)
+    sorted_targets = array.array('q', [0]) * len(targets)
+    for srcId, tgtId in zip(sources, targets):
+        sorted_targets[positions[srcId]] = tgtId
+        positions[srcId] += 1
+
+    return (offsets, sorted_targets)
+
+
+def _narrow(targets, vertex_count):
+    # Store targets as 32-bit integers, if the numbers of vertices fit
+    if vertex_count <= 2 ** 31:
+        return array.array('i', targets)
+
+    return targets
+
+
+if __name__ == '__main__':
+    import unittest
+
+    class CSR(unittest.TestCase):
+        def test_from_adjacency(self):
+            graph = CSRGraph.from_adjacency({'u': ('x', 'v'), 'x': ('v', ), 'v': ('y', ), 'y': ('x', ),
+                                             'w': ('y', 'z'), 'z': ('z', ), 'a': ('b', )})
+            self.assertEqual(len(graph), 8)
+            self.assertEqual(graph.edge_count, 9)
+            self.assertEqual([graph.id_of(index) for index in graph.neighbors(graph.index_of('w'))], ['y', 'z'])
+            self.assertEqual(list(graph.neighbors(graph.index_of('b'))), [])
+
+        def test_from_edges(self):
+            edges = [(2, 0), (0, 1), (2, 1), (0, 0)]
+            for intern in (False, True):
+                with self.subTest(intern=intern):
+                    graph = CSRGraph.from_edges(edges, intern=intern)
+                    self.assertEqual(len(graph), 3)
+                    adjacency = {graph.id_of(index): [graph.id_of(nindex) for nindex in graph.neighbors(index)]
+                                 for index in range(len(graph))}
+                    self.assertEqual(adjacency, {0: [1, 0], 1: [], 2: [0, 1]})
+            self.assertRaises(KeyError, CSRGraph.from_edges(edges, intern=False).index_of, 3)
+            self.assertEqual(len(CSRGraph.from_edges([])), 0)
+            self.assertEqual(len(CSRGraph.from_edges(edges, intern=False, vertex_count=5)), 5)
+            self.assertRaises(ValueError, CSRGraph.from_edges, [(0, 1), (2, 5)], intern=False, vertex_count=3)
+            self.assertRaises(ValueError, CSRGraph.from_edges, [(0, 1), (3, 2)], intern=False, vertex_count=3)
+            self.assertRaises(ValueError, CSRGraph.from_edges, [(0, -1)], intern=False)
+
+        def test_reverse(self):
+            graph = CSRGraph.from_adjacency({'a': ('b', 'c'), 'b': ('c', ), 'c': ('a', )})
+            reversed_graph = graph.reverse()
+            adjacency = {reversed_graph.id_of(index): [reversed_graph.id_of(nindex)
+                                                       for nindex in reversed_graph.neighbors(index)]
+                         for index in range(len(reversed_graph))}
+            self.assertEqual(adjacency, {'a': ['c'], 'b': ['a'], 'c': ['a', 'b']})
+
+    unittest.main()
@@ -13,9 +13,12 @@ a new source, and it repeats the search from that source. The algorithm repeats
 entire process until it has discovered every vertex
 """
 
+import array
 import collections
 import enum
 
+import csr_graph
+
 def find_path(graph, srcId, tgtId):
     """
     Finds a path between given vertices in O(V + E) time
@@ -76,7 +79,7 @@ def find_path(graph, srcId, tgtId):
     else:
         # A path exists
         vId = tgtId
-        while vId:
+        while vId is not None:
             path.append(vId)
             vId = data[vId]['previous']
         path.reverse()
@@ -84,6 +87,419 @@ def find_path(graph, srcId, tgtId):
 
     return path
 
+def find_path_csr(graph, srcId, tgtId):
+    """
+    Finds the same path as find_path does in O(V + E) time, but keeps colors
+    and previous vertices in typed arrays instead of a dictionary per vertex
+
+    Parameters
+    ----------
+    graph : csr_graph.CSRGraph
+        A graph in the compressed sparse row format
+
+    srcId, tgtId : object
+        Ids of the source and target vertices
+
+    Returns
+    -------
+    [object, ...]
+        A path between the source and target vertices
+    """
+    src, tgt = graph.index_of(srcId), graph.index_of(tgtId)
+    if src == tgt:
+        # The source and the target vertices are the same
+        return [srcId, tgtId]
+
+    # A byte per vertex tells whether it's discovered (gray), -1 stands for no previous vertex
+    gray = bytearray(len(graph))
+    previous = array.array('q', [-1]) * len(graph)
+    offsets, targets = graph.offsets, graph.targets
+
+    # Pushing to and popping from the end of a list visits vertices
+    # in the same order as the deque of find_path does
+    stack = [src]
+    while stack:
+        v = stack.pop()
+        if tgt == v:
+            break
+
+        if gray[v]:
+            continue
+        gray[v] = 1
+
+        for index in range(offsets[v], offsets[v + 1]):
+            nv = targets[index]
+            if gray[nv]:
+                continue
+            previous[nv] = v
+            stack.append(nv)
+
+    if previous[tgt] < 0:
+        # The target could not be reached from the source
+        return []
+
+    path = []
+    v = tgt
+    while 0 <= v:
+        path.append(graph.id_of(v))
+        v = previous[v]
+    path.reverse()
+    assert path[0] == srcId and path[-1] == tgtId
+
+    return path
+
+def find_path_bitmap(graph, srcId, tgtId):
+    """
+    Finds a path between given vertices in O(V + E) time keeping only a bit per vertex
+    in memory: the stack of the search holds the path to the current vertex, so there
+    is no need to remember previous vertices. It suits graphs mapped from files,
+    which are larger than the memory
+
+    Parameters
+    ----------
+    graph : csr_graph.CSRGraph or csr_file.MappedCSRGraph
+        A graph in the compressed sparse row format
+
+    srcId, tgtId : object
+        Ids of the source and target vertices
+
+    Returns
+    -------
+    [object, ...]
+        A path between the source and target vertices, [srcId, tgtId] if they
+        are the same, and [] if the target is not reachable
+    """
+    src, tgt = graph.index_of(srcId), graph.index_of(tgtId)
+    if src == tgt:
+        return [srcId, tgtId]
+
+    offsets, targets = graph.offsets, graph.targets
+    visited = bytearray((len(graph) + 7) // 8)
+    visited[src >> 3] |= 1 << (src & 7)
+
+    # Vertices on the path to the current one and positions of their next edges to explore
+    calls, positions = [src], [offsets[src]]
+    while calls:
+        v = calls[-1]
+        position = positions[-1]
+        if position == offsets[v + 1]:
+            calls.pop()
+            positions.pop()
+            continue
+
+        positions[-1] = position + 1
+        nv = targets[position]
+        if visited[nv >> 3] & (1 << (nv & 7)):
+            continue
+        visited[nv >> 3] |= 1 << (nv & 7)
+        calls.append(nv)
+        if nv == tgt:
+            return [graph.id_of(v) for v in calls]
+        positions.append(offsets[nv])
+
+    return []
+
+def strongly_connected_components(graph):
+    """
+    Finds strongly connected components by Tarjan's approach in O(V + E) time
+    with an explicit stack instead of recursion
+
+    Parameters
+    ----------
+    graph : csr_graph.CSRGraph
+        A graph in the compressed sparse row format
+
+    Returns
+    -------
+    (array('q'), int)
+        A component per vertex and the number of components. Components are numbered
+        in the reversed topological order: an edge between different components leads
+        from a larger number to a smaller one
+    """
+    offsets, targets = graph.offsets, graph.targets
+    vertex_count = len(graph)
+
+    # Discovery order of the vertices, the lowest discovery order reachable through
+    # the DFS subtree and a back edge, and the next edge to explore for every vertex
+    order = array.array('q', [-1]) * vertex_count
+    low = array.array('q', [0]) * vertex_count
+    positions = array.array('q', offsets[:vertex_count])
+    component = array.array('q', [-1]) * vertex_count
+    on_stack = bytearray(vertex_count)
+
+    stack = []
+    count = 0
+    discovered = 0
+    for root in range(vertex_count):
+        if 0 <= order[root]:
+            continue
+
+        order[root] = low[root] = discovered
+        discovered += 1
+        stack.append(root)
+        on_stack[root] = 1
+        calls = [root]
+        while calls:
+            v = calls[-1]
+            position = positions[v]
+            if position < offsets[v + 1]:
+                positions[v] = position + 1
+                nv = targets[position]
+                if order[nv] < 0:
+                    # Descend into a tree edge
+                    order[nv] = low[nv] = discovered
+                    discovered += 1
+                    stack.append(nv)
+                    on_stack[nv] = 1
+                    calls.append(nv)
+                elif on_stack[nv] and order[nv] < low[v]:
+                    low[v] = order[nv]
+                continue
+
+            # All the edges of the vertex are explored, return to its parent
+            calls.pop()
+            if calls and low[v] < low[calls[-1]]:
+                low[calls[-1]] = low[v]
+            if low[v] == order[v]:
+                # The vertex is the root of a component, which is on the top of the stack
+                while True:
+                    nv = stack.pop()
+                    on_stack[nv] = 0
+                    component[nv] = count
+                    if nv == v:
+                        break
+                count += 1
+
+    return (component, count)
+
+class DFSVisitor:
+    """
+    Callbacks of depth_first_search, which do nothing by default. Vertices are
+    given by their numbers in the graph, and times run from 1 to 2V as in Cormen
+    """
+
+    def discover_vertex(self, v, time):
+        pass
+
+    def finish_vertex(self, v, time):
+        pass
+
+    def tree_edge(self, v, nv):
+        pass
+
+    def back_edge(self, v, nv):
+        pass
+
+    def forward_edge(self, v, nv):
+        pass
+
+    def cross_edge(self, v, nv):
+        pass
+
+def depth_first_search(graph, visitor=None):
+    """
+    Searches the whole graph in the depth-first fashion in O(V + E) time with an
+    explicit stack, vertices are taken as roots and neighbors are explored in the
+    order of their numbers in the graph
+
+    Parameters
+    ----------
+    graph : csr_graph.CSRGraph
+        A graph in the compressed sparse row format
+
+    visitor : DFSVisitor, optional
+        Callbacks to notify about discovered and finished vertices and classified edges
+
+    Returns
+    -------
+    (array('q'), array('q'))
+        Discovery and finishing times of the vertices
+    """
+    offsets, targets = graph.offsets, graph.targets
+    vertex_count = len(graph)
+    visitor = visitor or DFSVisitor()
+
+    discovered = array.array('q', [0]) * vertex_count
+    finished = array.array('q', [0]) * vertex_count
+    positions = array.array('q', offsets[:vertex_count])
+
+    time = 0
+    for root in range(vertex_count):
+        if discovered[root]:
+            continue
+
+        time += 1
+        discovered[root] = time
+        visitor.discover_vertex(root, time)
+        calls = [root]
+        while calls:
+            v = calls[-1]
+            position = positions[v]
+            if position < offsets[v + 1]:
+                positions[v] = position + 1
+                nv = targets[position]
+                if not discovered[nv]:
+                    # A white vertex
+                    visitor.tree_edge(v, nv)
+                    time += 1
+                    discovered[nv] = time
+                    visitor.discover_vertex(nv, time)
+                    calls.append(nv)
+                elif not finished[nv]:
+                    # A gray vertex is an ancestor
+                    visitor.back_edge(v, nv)
+                elif discovered[v] < discovered[nv]:
+                    # A black vertex is either a descendant, or was discovered earlier
+                    visitor.forward_edge(v, nv)
+                else:
+                    visitor.cross_edge(v, nv)
+                continue
+
+            calls.pop()
+            time += 1
+            finished[v] = time
+            visitor.finish_vertex(v, time)
+
+    return (discovered, finished)
+
+class TopologicalSortVisitor(DFSVisitor):
+    """
+    Collects vertices of a directed acyclic graph in the topological order,
+    which is the reversed order of their finishing times
+
+    Attributes
+    ----------
+    order : [int, ...]
+        The vertices in the order of their finishing times
+
+    acyclic : bool
+        Whether no back edge, i.e. no cycle, was met
+    """
+
+    def __init__(self):
+        self.order = []
+        self.acyclic = True
+
+    def finish_vertex(self, v, time):
+        self.order.append(v)
+
+    def back_edge(self, v, nv):
+        self.acyclic = False
+
+    def sorted(self):
+        return self.order[::-1]
+
+class TarjanVisitor(DFSVisitor):
+    """
+    Finds strongly connected components by Tarjan's approach during a single search,
+    strongly_connected_components does the same without the callback overhead
+
+    Parameters
+    ----------
+    vertex_count : int
+        The number of vertices in the graph
+
+    Attributes
+    ----------
+    component : array('q')
+        A component per vertex numbered in the reversed topological order
+
+    count : int
+        The number of components
+    """
+
+    def __init__(self, vertex_count):
+        self.component = array.array('q', [-1]) * vertex_count
+        self.count = 0
+        self._order = array.array('q', [0]) * vertex_count
+        self._low = array.array('q', [0]) * vertex_count
+        self._parent = array.array('q', [-1]) * vertex_count
+        self._stack = []
+
+    def discover_vertex(self, v, time):
+        self._order[v] = self._low[v] = time
+        self._stack.append(v)
+
+    def tree_edge(self, v, nv):
+        self._parent[nv] = v
+
+    def back_edge(self, v, nv):
+        self._low[v] = min(self._low[v], self._order[nv])
+
+    def cross_edge(self, v, nv):
+        # Only vertices of components, which are not complete yet, count
+        if self.component[nv] < 0:
+            self._low[v] = min(self._low[v], self._order[nv])
+
+    def finish_vertex(self, v, time):
+        if self._low[v] == self._order[v]:
+            while True:
+                nv = self._stack.pop()
+                self.component[nv] = self.count
+                if nv == v:
+                    break
+            self.count += 1
+
+        parent = self._parent[v]
+        if 0 <= parent:
+            self._low[parent] = min(self._low[parent], self._low[v])
+
+def topological_sort(graph):
+    """
+    Sorts vertices of a directed acyclic graph topologically in O(V + E) time,
+    the same as TopologicalSortVisitor does without the callback overhead
+
+    Parameters
+    ----------
+    graph : csr_graph.CSRGraph
+        A graph in the compressed sparse row format
+
+    Returns
+    -------
+    array('q')
+        The vertices, every edge leads from an earlier vertex to a later one
+
+    Raises
+    ------
+    ValueError
+        If the graph has a cycle
+    """
+    offsets, targets = graph.offsets, graph.targets
+    vertex_count = len(graph)
+
+    # 0 stands for white, 1 for gray and 2 for black vertices
+    colors = bytearray(vertex_count)
+    positions = array.array('q', offsets[:vertex_count])
+    order = array.array('q', [0]) * vertex_count
+    # Vertices are put into the order from its end, as they are finished
+    remaining = vertex_count
+
+    for root in range(vertex_count):
+        if colors[root]:
+            continue
+
+        colors[root] = 1
+        calls = [root]
+        while calls:
+            v = calls[-1]
+            position = positions[v]
+            if position < offsets[v + 1]:
+                positions[v] = position + 1
+                nv = targets[position]
+                if not colors[nv]:
+                    colors[nv] = 1
+                    calls.append(nv)
+                elif colors[nv] == 1:
+                    raise ValueError("The graph has a cycle through the vertex " + repr(graph.id_of(nv)))
+                continue
+
+            calls.pop()
+            colors[v] = 2
+            remaining -= 1
+            order[remaining] = v
+
+    return order
+
 if __name__ == '__main__':
     import unittest
 
@@ -105,12 +521,15 @@ if __name__ == '__main__':
                      'z': {'u': [], 'x': [], 'v': [],
                            'y': [], 'w': [], 'z': ['z', 'z']}}
 
+            csr = csr_graph.CSRGraph.from_adjacency(graph)
             for srcId in sorted(paths):
                 for tgtId in sorted(paths[srcId]):
                     expected = paths[srcId][tgtId]
                     with self.subTest(srcId=srcId, tgtId=tgtId, expected=expected):
                         path = find_path(graph=graph, srcId=srcId, tgtId=tgtId)
                         self.assertEqual(path, expected)
+                        path = find_path_csr(graph=csr, srcId=srcId, tgtId=tgtId)
+                        self.assertEqual(path, expected)
 
         def test_fig_22_6(self):
             graph = {'q': ('s', 'w', 't'), 'r': ('y', 'u'), 's': ('v', ), 't': ('x', 'y'), 'u': ('y', ),
@@ -124,11 +543,105 @@ if __name__ == '__main__':
                            'w': ['r', 'u', 'y', 'q', 'w'], 'x': ['r', 'u', 'y', 'q', 't', 'x'],
                            'y': ['r', 'u', 'y'], 'z': ['r', 'u', 'y', 'q', 't', 'x', 'z']}}
 
+            csr = csr_graph.CSRGraph.from_adjacency(graph)
             for srcId in sorted(paths):
                 for tgtId in sorted(paths[srcId]):
                     expected = paths[srcId][tgtId]
                     with self.subTest(srcId=srcId, tgtId=tgtId, expected=expected):
                         path = find_path(graph=graph, srcId=srcId, tgtId=tgtId)
                         self.assertEqual(path, expected)
+                        path = find_path_csr(graph=csr, srcId=srcId, tgtId=tgtId)
+                        self.assertEqual(path, expected)
+
+        def test_falsy_ids(self):
+            graph = {0: (1, ), 1: (2, ), 2: ()}
+            csr = csr_graph.CSRGraph.from_edges([(0, 1), (1, 2)], intern=False)
+            self.assertEqual(find_path(graph=graph, srcId=0, tgtId=2), [0, 1, 2])
+            self.assertEqual(find_path_csr(graph=csr, srcId=0, tgtId=2), [0, 1, 2])
+            self.assertEqual(find_path_csr(graph=csr, srcId=2, tgtId=0), [])
+
+        def test_scc(self):
+            # Figure 22.9
+            graph = csr_graph.CSRGraph.from_adjacency({'a': ('b', ), 'b': ('c', 'e', 'f'), 'c': ('d', 'g'),
+                                                       'd': ('c', 'h'), 'e': ('a', 'f'), 'f': ('g', ),
+                                                       'g': ('f', 'h'), 'h': ('h', )})
+            component, count = strongly_connected_components(graph)
+            self.assertEqual(count, 4)
+            groups = {}
+            for index in range(len(graph)):
+                groups.setdefault(component[index], set()).add(graph.id_of(index))
+            self.assertEqual(sorted(map(sorted, groups.values())), [['a', 'b', 'e'], ['c', 'd'], ['f', 'g'], ['h']])
+            for index in range(len(graph)):
+                for nindex in graph.neighbors(index):
+                    self.assertGreaterEqual(component[index], component[nindex])
+
+        def test_fig_22_4_times(self):
+            graph = csr_graph.CSRGraph.from_adjacency({'u': ('v', 'x'), 'v': ('y', ), 'w': ('y', 'z'), 'x': ('v', ),
+                                                       'y': ('x', ), 'z': ('z', )})
+
+            class Edges(DFSVisitor):
+                def __init__(self):
+                    self.kinds = {}
+
+                def tree_edge(self, v, nv):
+                    self.kinds[graph.id_of(v) + graph.id_of(nv)] = 'T'
+
+                def back_edge(self, v, nv):
+                    self.kinds[graph.id_of(v) + graph.id_of(nv)] = 'B'
+
+                def forward_edge(self, v, nv):
+                    self.kinds[graph.id_of(v) + graph.id_of(nv)] = 'F'
+
+                def cross_edge(self, v, nv):
+                    self.kinds[graph.id_of(v) + graph.id_of(nv)] = 'C'
+
+            visitor = Edges()
+            discovered, finished = depth_first_search(graph, visitor)
+            times = {graph.id_of(v): (discovered[v], finished[v]) for v in range(len(graph))}
+            self.assertEqual(times, {'u': (1, 8), 'v': (2, 7), 'y': (3, 6), 'x': (4, 5), 'w': (9, 12), 'z': (10, 11)})
+            self.assertEqual(visitor.kinds, {'uv': 'T', 'vy': 'T', 'yx': 'T', 'xv': 'B', 'ux': 'F', 'wy': 'C',
+                                             'wz': 'T', 'zz': 'B'})
+
+        def test_fig_22_7(self):
+            graph = csr_graph.CSRGraph.from_adjacency({'undershorts': ('pants', 'shoes'), 'pants': ('belt', 'shoes'),
+                                                       'belt': ('jacket', ), 'shirt': ('belt', 'tie'),
+                                                       'tie': ('jacket', ), 'socks': ('shoes', ), 'watch': ()})
+            visitor = TopologicalSortVisitor()
+            depth_first_search(graph, visitor)
+            self.assertTrue(visitor.acyclic)
+            expected = visitor.sorted()
+            self.assertEqual(list(topological_sort(graph)), expected)
+            rank = {v: position for position, v in enumerate(expected)}
+            for v in range(len(graph)):
+                for nv in graph.neighbors(v):
+                    self.assertLess(rank[v], rank[nv])
+
+            cyclic = csr_graph.CSRGraph.from_adjacency({'a': ('b', ), 'b': ('a', )})
+            self.assertRaises(ValueError, topological_sort, cyclic)
+            visitor = TopologicalSortVisitor()
+            depth_first_search(cyclic, visitor)
+            self.assertFalse(visitor.acyclic)
+
+        def test_tarjan_visitor(self):
+            import random
+            generator = random.Random(22)
+            for _ in range(50):
+                vertex_count = generator.randint(1, 30)
+                graph = csr_graph.CSRGraph.from_edges([(generator.randrange(vertex_count),
+                                                        generator.randrange(vertex_count))
+                                                       for _ in range(generator.randint(0, 60))],
+                                                      intern=False, vertex_count=vertex_count)
+                visitor = TarjanVisitor(vertex_count)
+                depth_first_search(graph, visitor)
+                self.assertEqual((visitor.component, visitor.count), strongly_connected_components(graph))
+
+        def test_deep(self):
+            # A path deeper than the recursion limit
+            vertex_count = 100000
+            graph = csr_graph.CSRGraph.from_edges([(v, v + 1) for v in range(vertex_count - 1)], intern=False)
+            discovered, finished = depth_first_search(graph)
+            self.assertEqual((discovered[-1], finished[0]), (vertex_count, 2 * vertex_count))
+            self.assertEqual(list(topological_sort(graph)), list(range(vertex_count)))
+            self.assertEqual(strongly_connected_components(graph)[1], vertex_count)
 
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,427 @@
+"""
+A reachability index for answering many path queries against a static graph.
+
+Strongly connected components of the graph are condensed into a directed acyclic
+graph (DAG), where components are numbered in the reversed topological order.
+Every component is labeled by a few intervals of post-order numbers of randomized
+traversals of the DAG (GRAIL, Yildirim et al.): if the target is reachable from the
+source, the label of the target is nested in the label of the source, so most of
+negative queries are answered in O(1) time.
+
+Every component also keeps sorted, merged intervals of post-order numbers of the DFS
+spanning tree covering all the components reachable from it (Agrawal et al.), so the
+rest of queries takes a binary search. The number of intervals per component is
+limited: a component, which had to drop some of them, keeps only a part of the ones
+it covers, and queries from it are settled by a search of the DAG, which is pruned
+by the labels and stops at components with all their intervals.
+
+Paths are found by a depth-first search of the graph, which follows only the edges
+leading to vertices the target is reachable from.
+"""
+
+import array
+import bisect
+import random
+import sys
+import time
+
+import csr_graph
+import depth_first_search
+
+
+class ReachabilityIndex:
+    """
+    A reachability index of a graph built in O(k (V + E)) time
+
+    Parameters
+    ----------
+    graph : csr_graph.CSRGraph
+        A graph in the compressed sparse row format
+
+    labels : int
+        The number of randomized traversals to label the components by
+
+    seed : int
+        A seed of the randomized traversals
+
+    interval_limit : int
+        The largest number of intervals to keep per component
+
+    Attributes
+    ----------
+    build_seconds : float
+        Time it took to build the index
+
+    index_bytes : int
+        Size of the arrays of the index in bytes, the graph itself excluded
+    """
+
+    def __init__(self, graph, labels=2, seed=21, interval_limit=64):
+        assert 0 < labels, "At least a single label is expected"
+        assert 0 < interval_limit, "At least a single interval per component is expected"
+        start = time.perf_counter()
+
+        self.graph = graph
+        self.component, self.component_count = depth_first_search.strongly_connected_components(graph)
+        self.dag = self._condense()
+
+        # Post-order numbers and the lowest post-order numbers reachable per traversal,
+        # and the lowest post-order numbers in the subtrees of the first traversal
+        generator = random.Random(seed)
+        self.posts, self.lows = [], []
+        for traversal in range(labels):
+            post, tree_low = self._traverse(generator, traversal % 2 == 1)
+            self.posts.append(post)
+            self.lows.append(self._lowest_reachable(post))
+            if traversal == 0:
+                self.tree_low = tree_low
+        self._label_intervals(interval_limit)
+
+        self.build_seconds = time.perf_counter() - start
+        self.index_bytes = sum(memoryview(values).nbytes
+                               for values in [self.component, self.dag.offsets, self.dag.targets, self.tree_low,
+                                              self.interval_offsets, self.interval_lows, self.interval_highs,
+                                              self.complete] + self.posts + self.lows)
+
+    def _condense(self):
+        # Build the DAG of the components without parallel edges and loops
+        component, offsets, targets = self.component, self.graph.offsets, self.graph.targets
+        last_source = array.array('q', [-1]) * self.component_count
+
+        def edges():
+            for v in range(len(self.graph)):
+                cv = component[v]
+                for index in range(offsets[v], offsets[v + 1]):
+                    cw = component[targets[index]]
+                    if cw != cv and last_source[cw] != v:
+                        last_source[cw] = v
+                        yield (cv, cw)
+
+        # Edges of a component may come from several vertices, so duplicates are dropped after grouping
+        dag = csr_graph.CSRGraph.from_edges(edges(), intern=False, vertex_count=self.component_count)
+        last_source = array.array('q', [-1]) * self.component_count
+        offsets = array.array('q', [0])
+        targets = array.array(dag.targets.typecode)
+        for c in range(self.component_count):
+            for index in range(dag.offsets[c], dag.offsets[c + 1]):
+                cw = dag.targets[index]
+                if last_source[cw] != c:
+                    last_source[cw] = c
+                    targets.append(cw)
+            offsets.append(len(targets))
+
+        return csr_graph.CSRGraph(offsets, targets)
+
+    def _traverse(self, generator, reverse):
+        # Number components in the post-order of a DFS of the DAG starting from roots in a random order,
+        # children are explored in the given or the reversed order. Provide the post-order numbers and
+        # the lowest post-order number in the subtree of every component
+        offsets, targets = self.dag.offsets, self.dag.targets
+        count = self.component_count
+        post = array.array('q', [-1]) * count
+        tree_low = array.array('q', [-1]) * count
+        positions = array.array('q', offsets[1:] if reverse else offsets[:-1])
+        step = -1 if reverse else 1
+
+        roots = list(range(count))
+        generator.shuffle(roots)
+        numbered = 0
+        for root in roots:
+            if 0 <= tree_low[root]:
+                continue
+            tree_low[root] = numbered
+            calls = [root]
+            while calls:
+                c = calls[-1]
+                position = positions[c]
+                if (position > offsets[c]) if reverse else (position < offsets[c + 1]):
+                    positions[c] = position + step
+                    cw = targets[position - 1 if reverse else position]
+                    if tree_low[cw] < 0:
+                        tree_low[cw] = numbered
+                        calls.append(cw)
+                    continue
+
+                calls.pop()
+                post[c] = numbered
+                numbered += 1
+
+        return (post, tree_low)
+
+    def _lowest_reachable(self, post):
+        # Components reachable from a component have smaller numbers, so they are labeled first
+        offsets, targets = self.dag.offsets, self.dag.targets
+        low = array.array('q', post)
+        for c in range(self.component_count):
+            for index in range(offsets[c], offsets[c + 1]):
+                if low[targets[index]] < low[c]:
+                    low[c] = low[targets[index]]
+
+        return low
+
+    def _label_intervals(self, limit):
+        # Merge intervals of the children with the interval of the subtree of every component, components reachable
+        # from a component have smaller numbers, so they are labeled first. Intervals of a component are kept at
+        # interval_lows/highs[interval_offsets[c]:interval_offsets[c + 1]] sorted by their lower bounds
+        offsets, targets = self.dag.offsets, self.dag.targets
+        post, tree_low = self.posts[0], self.tree_low
+        self.interval_offsets = array.array('q', [0])
+        self.interval_lows = lows = array.array('q')
+        self.interval_highs = highs = array.array('q')
+        self.complete = bytearray(self.component_count)
+        for c in range(self.component_count):
+            intervals = [(tree_low[c], post[c])]
+            complete = True
+            for index in range(offsets[c], offsets[c + 1]):
+                cw = targets[index]
+                begin, end = self.interval_offsets[cw], self.interval_offsets[cw + 1]
+                intervals.extend(zip(lows[begin:end], highs[begin:end]))
+                complete = complete and self.complete[cw]
+            intervals.sort()
+
+            merged = []
+            for low, high in intervals:
+                if merged and low <= merged[-1][1] + 1:
+                    if merged[-1][1] < high:
+                        merged[-1] = (merged[-1][0], high)
+                else:
+                    merged.append((low, high))
+            if limit < len(merged):
+                # Keep the widest intervals, any part of them still proves reachability
+                merged = sorted(sorted(merged, key=lambda interval: interval[0] - interval[1])[:limit])
+                complete = False
+
+            for low, high in merged:
+                lows.append(low)
+                highs.append(high)
+            self.interval_offsets.append(len(lows))
+            self.complete[c] = complete
+
+    def _covers(self, cu, cv):
+        # Whether intervals of the component cu prove, that the component cv is reachable from it
+        number = self.posts[0][cv]
+        position = bisect.bisect_right(self.interval_lows, number, self.interval_offsets[cu],
+                                       self.interval_offsets[cu + 1]) - 1
+        return self.interval_offsets[cu] <= position and number <= self.interval_highs[position]
+
+    def _excluded(self, cu, cv):
+        # Whether the labels prove, that the component cv is not reachable from cu
+        if cu < cv:
+            return True
+        for post, low in zip(self.posts, self.lows):
+            if post[cu] < post[cv] or low[cv] < low[cu]:
+                return True
+
+        return False
+
+    def _component_reachable(self, cu, cv, reaching=None):
+        # Memoized answers for the component cv may be given in the dictionary reaching, the components found
+        # not to reach cv by the search below are added to it
+        if reaching is not None and cu in reaching:
+            return reaching[cu]
+        if cu == cv:
+            return True
+        if self._excluded(cu, cv):
+            return False
+        if self._covers(cu, cv):
+            return True
+        if self.complete[cu]:
+            return False
+
+        # Search the DAG, following only the components, which are not excluded by the labels
+        # and may reach the target through components with dropped intervals
+        offsets, targets = self.dag.offsets, self.dag.targets
+        visited = {cu}
+        stack = [cu]
+        while stack:
+            c = stack.pop()
+            for index in range(offsets[c], offsets[c + 1]):
+                cw = targets[index]
+                if cw in visited or (reaching is not None and reaching.get(cw) is False):
+                    continue
+                visited.add(cw)
+                if cw == cv or self._covers(cw, cv):
+                    return True
+                if not self.complete[cw] and not self._excluded(cw, cv):
+                    stack.append(cw)
+
+        # Nothing reachable from the visited components reaches the target
+        if reaching is not None:
+            reaching.update(dict.fromkeys(visited, False))
+        return False
+
+    def reachable(self, srcId, tgtId):
+        """
+        Checks whether the target vertex is reachable from the source one, in O(log k) time
+        for components with at most interval_limit intervals k, and O(1) for most negative queries
+
+        Parameters
+        ----------
+        srcId, tgtId : object
+            Ids of the source and target vertices
+
+        Returns
+        -------
+        bool
+            Whether a path between the source and target vertices exists
+        """
+        return self._component_reachable(self.component[self.graph.index_of(srcId)],
+                                         self.component[self.graph.index_of(tgtId)])
+
+    def find_path(self, srcId, tgtId):
+        """
+        Finds a path between given vertices exploring only vertices, which the target is reachable from
+
+        Parameters
+        ----------
+        srcId, tgtId : object
+            Ids of the source and target vertices
+
+        Returns
+        -------
+        [object, ...]
+            A path between the source and target vertices, [srcId, tgtId] if they are
+            the same, and [] if the target is not reachable
+        """
+        graph = self.graph
+        src, tgt = graph.index_of(srcId), graph.index_of(tgtId)
+        if src == tgt:
+            return [srcId, tgtId]
+        ct = self.component[tgt]
+        if not self._component_reachable(self.component[src], ct):
+            return []
+
+        # Every vertex on the stack reaches the target, so the search never runs into a dead end
+        # other than an already discovered vertex. Answers for components are memoized for the query
+        offsets, targets, component = graph.offsets, graph.targets, self.component
+        reaching = {ct: True}
+        previous = {src: -1}
+        stack = [src]
+        while tgt not in previous:
+            v = stack.pop()
+            for index in range(offsets[v], offsets[v + 1]):
+                nv = targets[index]
+                if nv in previous:
+                    continue
+                cw = component[nv]
+                reaches = reaching.get(cw)
+                if reaches is None:
+                    reaches = reaching[cw] = self._component_reachable(cw, ct, reaching)
+                if reaches:
+                    previous[nv] = v
+                    if nv == tgt:
+                        break
+                    stack.append(nv)
+
+        path = []
+        v = tgt
+        while 0 <= v:
+            path.append(graph.id_of(v))
+            v = previous[v]
+        path.reverse()
+
+        return path
+
+
+def benchmark(vertex_count=100000, edge_count=300000, queries=10000, seed=21):
+    # Report the build time and size of the index and compare latencies of queries against find_path_csr
+    generator = random.Random(seed)
+    # Edges mostly lead to larger vertices, so the graph has a lot of small components and long DAG paths
+    local = []
+    for _ in range(edge_count):
+        v = generator.randrange(vertex_count)
+        w = min(vertex_count - 1, v + generator.randrange(1, 50)) if generator.random() < 0.95 \
+            else generator.randrange(vertex_count)
+        local.append((v, w))
+    # Edges of a random DAG span farther, so a lot of components have too many intervals to keep
+    dag_vertex_count = vertex_count * 2 // 5
+    dag = []
+    for _ in range(edge_count * 2 // 5):
+        v = generator.randrange(dag_vertex_count)
+        dag.append((v, min(dag_vertex_count - 1, v + generator.randrange(1, 2000))))
+
+    for name, edges, count in (('local', local, vertex_count), ('random dag', dag, dag_vertex_count)):
+        graph = csr_graph.CSRGraph.from_edges(edges, intern=False, vertex_count=count)
+        index = ReachabilityIndex(graph)
+        print(name, 'vertices =', count, 'edges =', len(edges), 'components =', index.component_count,
+              'complete =', sum(index.complete))
+        print('build =', format(index.build_seconds, '.3f') + 's', 'index =', index.index_bytes, 'bytes')
+
+        pairs = [(generator.randrange(count), generator.randrange(count)) for _ in range(queries)]
+        start = time.perf_counter()
+        answers = [index.reachable(v, w) for v, w in pairs]
+        elapsed = time.perf_counter() - start
+        print('reachable =', format(elapsed / queries * 1e6, '.1f') + 'us per query,', sum(answers), 'positive')
+        positive = [pair for pair, answer in zip(pairs, answers) if answer]
+        start = time.perf_counter()
+        for v, w in positive:
+            index.reachable(v, w)
+        print('positive reachable =', format((time.perf_counter() - start) / max(1, len(positive)) * 1e6, '.1f') +
+              'us per query')
+
+        start = time.perf_counter()
+        paths = [index.find_path(v, w) for v, w in pairs[:100]]
+        guided = time.perf_counter() - start
+        print('index find_path =', format(guided / 100 * 1e3, '.3f') + 'ms per query')
+
+        start = time.perf_counter()
+        expected = [depth_first_search.find_path_csr(graph, v, w) for v, w in pairs[:100]]
+        plain = time.perf_counter() - start
+        print('find_path_csr =', format(plain / 100 * 1e3, '.3f') + 'ms per query,',
+              'speedup =', format(plain / guided, '.1f') + 'x')
+        assert [bool(path) for path in paths] == [bool(path) for path in expected]
+
+
+if __name__ == '__main__':
+    import unittest
+
+    class Reachability(unittest.TestCase):
+        def assertPath(self, graph, path, srcId, tgtId):
+            self.assertEqual((path[0], path[-1]), (srcId, tgtId))
+            for vId, nvId in zip(path, path[1:]):
+                self.assertIn(nvId, graph[vId])
+
+        def test_fig_22_6(self):
+            graph = {'q': ('s', 'w', 't'), 'r': ('y', 'u'), 's': ('v', ), 't': ('x', 'y'), 'u': ('y', ),
+                     'v': ('w', ), 'w': ('s', ), 'x': ('z', ), 'y': ('q', ), 'z': ('x', )}
+            csr = csr_graph.CSRGraph.from_adjacency(graph)
+            index = ReachabilityIndex(csr)
+            self.assertEqual(index.component_count, 5)
+            for srcId in graph:
+                for tgtId in graph:
+                    with self.subTest(srcId=srcId, tgtId=tgtId):
+                        expected = depth_first_search.find_path_csr(csr, srcId, tgtId)
+                        path = index.find_path(srcId, tgtId)
+                        self.assertEqual(index.reachable(srcId, tgtId), bool(expected))
+                        if srcId == tgtId:
+                            self.assertEqual(path, [srcId, tgtId])
+                        elif expected:
+                            self.assertPath(graph, path, srcId, tgtId)
+                        else:
+                            self.assertEqual(path, [])
+
+        def test_random(self):
+            generator = random.Random(21)
+            for trial in range(20):
+                vertex_count = generator.randint(1, 40)
+                edges = [(generator.randrange(vertex_count), generator.randrange(vertex_count))
+                         for _ in range(generator.randint(0, 80))]
+                csr = csr_graph.CSRGraph.from_edges(edges, intern=False, vertex_count=vertex_count)
+                graph = {v: tuple(csr.neighbors(v)) for v in range(vertex_count)}
+                index = ReachabilityIndex(csr, labels=generator.randint(1, 3), seed=trial,
+                                          interval_limit=generator.choice((1, 2, 64)))
+                for v in range(vertex_count):
+                    for w in range(vertex_count):
+                        with self.subTest(trial=trial, v=v, w=w):
+                            expected = bool(depth_first_search.find_path_csr(csr, v, w))
+                            self.assertEqual(index.reachable(v, w), expected)
+                            path = index.find_path(v, w)
+                            if expected and v != w:
+                                self.assertPath(graph, path, v, w)
+                            else:
+                                self.assertEqual(bool(path), expected)
+
+    if '--benchmark' in sys.argv:
+        benchmark()
+    else:
+        unittest.main()
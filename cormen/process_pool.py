@@ -0,0 +1,95 @@
+"""
+Helpers for process pools shared by the chapters: batch queries of several chapters send
+chunks of their queries to the workers of a pool and consume the results lazily.
+"""
+
+import os
+import queue
+
+
+def imap_bounded(pool, function, tasks, processes=None):
+    """
+    The same as pool.imap_unordered, but at most two tasks per process are in flight, so tasks
+    are drawn from the iterable only as fast as the workers complete them
+
+    Parameters
+    ----------
+    pool : multiprocessing.pool.Pool
+        A pool to apply the function in
+
+    function : callable
+        A function of a single task, which is picklable
+
+    tasks : iterable
+        Tasks to apply the function to, which are consumed lazily
+
+    processes : int, optional
+        The number of processes of the pool, all the cores by default
+
+    Yields
+    ------
+    object
+        Results of the function in the order of completion, an exception raised by the function
+        is raised again here
+    """
+    window = 2 * (processes or os.cpu_count() or 1)
+    done = queue.Queue()
+    pending = 0
+    for task in tasks:
+        pool.apply_async(function, (task, ), callback=done.put, error_callback=done.put)
+        pending += 1
+        while True:
+            try:
+                result = done.get(block=window <= pending)
+            except queue.Empty:
+                break
+            pending -= 1
+            if isinstance(result, BaseException):
+                raise result
+            yield result
+
+    while pending:
+        result = done.get()
+        pending -= 1
+        if isinstance(result, BaseException):
+            raise result
+        yield result
+
+
+def _square(x):
+    if x < 0:
+        raise ValueError(x)
+    return x * x
+
+
+if __name__ == '__main__':
+    import multiprocessing
+    import unittest
+
+    class ProcessPool(unittest.TestCase):
+        def test_results(self):
+            with multiprocessing.Pool(2) as pool:
+                self.assertEqual(sorted(imap_bounded(pool, _square, iter(range(100)), 2)),
+                                 [x * x for x in range(100)])
+                self.assertEqual(list(imap_bounded(pool, _square, [], 2)), [])
+
+        def test_lazy(self):
+            drawn = []
+
+            def tasks():
+                for x in range(10000):
+                    drawn.append(x)
+                    yield x
+
+            with multiprocessing.Pool(2) as pool:
+                results = imap_bounded(pool, _square, tasks(), 2)
+                next(results)
+                self.assertLessEqual(len(drawn), 2 * 2 + 1)
+                results.close()
+
+        def test_error(self):
+            with multiprocessing.Pool(2) as pool:
+                with self.assertRaises(ValueError):
+                    list(imap_bounded(pool, _square, [1, -1, 2], 2))
+
+    unittest.main()